@@ -0,0 +1,426 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+import json
+import re
+import threading
+import urllib.parse as urlParse
+
+class ElasticSearchStandIn:
+    """Class used to stand in for an ElasticSearch instance during benchmarks, it answers the REST calls made by Indexer on a local HTTP server and keeps the documents in memory
+    Only the calls used by the project are supported: cluster info, index, update, get, bulk, count, a match_all search, the index, mapping, settings and alias management used by Indexer.rebuild
+    and the point in time searches (term filters, slices and search_after) used by Exporter
+    Attributes
+    ----------
+    indices : dict
+        The stored documents, by index name then by document id
+    settings : dict
+        The settings of each index, by index name
+    mappings : dict
+        The explicit mapping properties of each index created with one, by index name
+    aliases : dict
+        The set of indices behind each alias, by alias name
+    pointsInTime : dict
+        The mapping properties and the frozen list of (id, document) pairs of each open point in time, by point in time id
+    calls : Counter
+        The number of answered calls of each type ("index", "update", "bulk", ...)
+    """
+
+    version = "7.17.0"
+
+    def __init__(self):
+        self.indices = {}
+        self.settings = {}
+        self.mappings = {}
+        self.aliases = {}
+        self.pointsInTime = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.httpServer = ThreadingHTTPServer(("127.0.0.1", 0), self._handlerClass())
+        self.httpServer.daemon_threads = True
+        self.thread = None
+
+    @property
+    def host(self):
+        return "127.0.0.1"
+
+    @property
+    def port(self):
+        return self.httpServer.server_address[1]
+
+    def start(self):
+        """
+        Starts serving in a background thread
+        """
+        self.thread = threading.Thread(target=self.httpServer.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops serving and releases the socket
+        """
+        self.httpServer.shutdown()
+        self.httpServer.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args_):
+        self.stop()
+
+    def resolve(self, name_):
+        """
+        Returns the name of the index behind the given alias, or the given name if it is not an alias
+        """
+        indices = self.aliases.get(name_)
+        if indices:
+            return next(iter(indices))
+        return name_
+
+    def createIndex(self, index_, settings_ = None, mappings_ = None):
+        """
+        Creates an empty index, returns False if an index or an alias of the same name already exists
+        """
+        with self.lock:
+            if index_ in self.indices or index_ in self.aliases:
+                return False
+            self.indices[index_] = {}
+            self.settings[index_] = {"number_of_shards": "1", "number_of_replicas": "1"}
+            self.settings[index_].update({k: str(v) for k, v in (settings_ or {}).items()})
+            if mappings_:
+                self.mappings[index_] = mappings_.get("properties", {})
+        return True
+
+    def deleteIndex(self, index_):
+        """
+        Deletes an index and removes it from every alias, returns False if it does not exist
+        """
+        with self.lock:
+            if index_ not in self.indices:
+                return False
+            del self.indices[index_]
+            self.settings.pop(index_, None)
+            self.mappings.pop(index_, None)
+            for indices in self.aliases.values():
+                indices.discard(index_)
+            self.aliases = {alias: indices for alias, indices in self.aliases.items() if indices}
+        return True
+
+    def updateAliases(self, actions_):
+        """
+        Applies the given alias actions (add, remove, remove_index) all at once
+        """
+        with self.lock:
+            for action in actions_:
+                (opType, params), = action.items()
+                if opType == "add":
+                    self.aliases.setdefault(params["alias"], set()).add(params["index"])
+                elif opType == "remove":
+                    self.aliases.get(params["alias"], set()).discard(params["index"])
+                elif opType == "remove_index":
+                    self.indices.pop(params["index"], None)
+                    self.settings.pop(params["index"], None)
+                    self.mappings.pop(params["index"], None)
+            self.aliases = {alias: indices for alias, indices in self.aliases.items() if indices}
+
+    def indexDocument(self, index_, id_, doc_):
+        """
+        Stores the given document, returns True if it was created and False if it replaced an existing one
+        """
+        with self.lock:
+            index = self.resolve(index_)
+            if index not in self.indices:
+                self.settings[index] = {"number_of_shards": "1", "number_of_replicas": "1"}
+            created = id_ not in self.indices.setdefault(index, {})
+            self.indices[index][id_] = doc_
+        return created
+
+    def updateDocument(self, index_, id_, doc_):
+        """
+        Merges the given partial document into an existing one, returns False if the document does not exist
+        """
+        with self.lock:
+            index = self.resolve(index_)
+            if id_ not in self.indices.get(index, {}):
+                return False
+            self.indices[index][id_].update(doc_)
+        return True
+
+    def documents(self, name_):
+        """
+        Returns the documents of the given index or alias
+        """
+        return self.indices.get(self.resolve(name_), {})
+
+    def mapping(self, name_):
+        """
+        Returns the mapping properties of the given index or alias, the mapping of an index created without one is inferred from its documents
+        the way ElasticSearch's dynamic mapping does it (strings become text fields with a keyword sub-field)
+        """
+        def dynamicType(value_):
+            if isinstance(value_, list):
+                return dynamicType(value_[0]) if value_ else None
+            if isinstance(value_, bool):
+                return {"type": "boolean"}
+            if isinstance(value_, int):
+                return {"type": "long"}
+            if isinstance(value_, float):
+                return {"type": "float"}
+            if isinstance(value_, str):
+                return {"type": "text", "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}}
+            return None
+
+        index = self.resolve(name_)
+        if index in self.mappings:
+            return self.mappings[index]
+        properties = {}
+        for doc in list(self.documents(index).values()):
+            for field, value in doc.items():
+                if field not in properties and dynamicType(value) is not None:
+                    properties[field] = dynamicType(value)
+        return properties
+
+    def unsearchableFields(self, name_, query_):
+        """
+        Returns the fields named by the match and multi_match clauses of the query that are mapped with "index": false, ElasticSearch rejects such queries
+        """
+        properties = self.mapping(name_)
+        fields = []
+        if "multi_match" in query_:
+            fields = query_["multi_match"].get("fields", [])
+        elif "match" in query_:
+            fields = list(query_["match"])
+        return [field for field in fields if properties.get(field, {}).get("index") is False]
+
+    @staticmethod
+    def matchesQuery(doc_, query_, properties_ = None):
+        """
+        Returns True if the given document matches the query, only match_all and bool queries made of term and terms filters are supported
+        A term filter on a text field is compared to the lowercased tokens of the field, as ElasticSearch compares it to the analysed terms, and a term filter on
+        a <field>.keyword sub-field is compared to the raw value of the field
+        """
+        def values(field_):
+            value = doc_.get(field_.split(".")[0])
+            value = value if isinstance(value, list) else [value]
+            if "." not in field_ and (properties_ or {}).get(field_, {}).get("type") == "text":
+                return [token for v in value if isinstance(v, str) for token in re.findall(r"\w+", v.lower())]
+            return value
+
+        if not query_ or "match_all" in query_:
+            return True
+        for clause in query_.get("bool", {}).get("filter", []):
+            (opType, params), = clause.items()
+            (field, expected), = params.items()
+            expected = expected if opType == "terms" else [expected]
+            if not any(v in expected for v in values(field)):
+                return False
+        return True
+
+    def searchPointInTime(self, body_):
+        """
+        Answers a search made on a point in time, documents are sorted by their position in the point in time, which is also used to split the slices
+        """
+        pointInTime = self.pointsInTime.get(body_["pit"]["id"])
+        if pointInTime is None:
+            return None
+        properties, snapshot = pointInTime
+        after = body_.get("search_after", [-1])[0]
+        sliceParams = body_.get("slice")
+        source = body_.get("_source")
+        hits = []
+        for position in range(after + 1, len(snapshot)):
+            if sliceParams is not None and position % sliceParams["max"] != sliceParams["id"]:
+                continue
+            id_, doc = snapshot[position]
+            if not self.matchesQuery(doc, body_.get("query"), properties):
+                continue
+            hits.append({"_id": id_, "_source": {k: v for k, v in doc.items() if source is None or k in source}, "sort": [position]})
+            if len(hits) >= body_.get("size", 10):
+                break
+        return {"pit_id": body_["pit"]["id"], "hits": {"hits": hits}}
+
+    def bulk(self, lines_, defaultIndex_ = None):
+        """
+        Applies the operations of a bulk request body, given as its decoded NDJSON lines
+        Returns
+        -------
+        list
+            the items of the bulk response
+        """
+        items = []
+        lines = iter(lines_)
+        for action in lines:
+            (opType, meta), = action.items()
+            index = meta.get("_index", defaultIndex_)
+            id_ = meta.get("_id")
+            if opType == "delete":
+                with self.lock:
+                    found = self.indices.get(self.resolve(index), {}).pop(id_, None) is not None
+                items.append({opType: {"_index": index, "_id": id_, "status": 200 if found else 404}})
+                continue
+            source = next(lines)
+            if opType in ("index", "create"):
+                created = self.indexDocument(index, id_, source)
+                items.append({opType: {"_index": index, "_id": id_, "result": "created" if created else "updated", "status": 201 if created else 200}})
+            elif opType == "update":
+                if self.updateDocument(index, id_, source.get("doc", {})):
+                    items.append({opType: {"_index": index, "_id": id_, "result": "updated", "status": 200}})
+                elif source.get("doc_as_upsert"):
+                    self.indexDocument(index, id_, source.get("doc", {}))
+                    items.append({opType: {"_index": index, "_id": id_, "result": "created", "status": 201}})
+                else:
+                    items.append({opType: {"_index": index, "_id": id_, "status": 404, "error": {"type": "document_missing_exception"}}})
+        return items
+
+    def _handlerClass(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, *args_):
+                pass
+
+            def answer(self, status_, body_):
+                body = json.dumps(body_).encode()
+                self.send_response(status_)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def readBody(self):
+                length = int(self.headers.get("Content-Length", 0))
+                return self.rfile.read(length).decode() if length > 0 else ""
+
+            def route(self, method_):
+                path = urlParse.urlsplit(self.path)
+                parts = [urlParse.unquote(p) for p in path.path.strip("/").split("/") if p]
+                query = dict(urlParse.parse_qsl(path.query))
+                body = self.readBody()
+
+                if not parts:
+                    server.calls["info"] += 1
+                    return self.answer(200, {"name": "standIn", "cluster_name": "standIn", "version": {"number": server.version, "build_flavor": "default"}, "tagline": "You Know, for Search"})
+
+                if parts[-1] == "_bulk":
+                    server.calls["bulk"] += 1
+                    lines = [json.loads(line) for line in body.split("\n") if line.strip()]
+                    items = server.bulk(lines, parts[0] if len(parts) == 2 else None)
+                    return self.answer(200, {"took": 0, "errors": any("error" in next(iter(i.values())) for i in items), "items": items})
+
+                if parts[0] == "_pit" and method_ == "DELETE":
+                    server.calls["closePit"] += 1
+                    found = server.pointsInTime.pop(json.loads(body).get("id"), None) is not None
+                    return self.answer(200 if found else 404, {"succeeded": found, "num_freed": int(found)})
+                if parts == ["_search"]:
+                    server.calls["search"] += 1
+                    response = server.searchPointInTime(json.loads(body)) if body and "pit" in json.loads(body) else None
+                    if response is None:
+                        return self.answer(404, {"error": {"type": "search_context_missing_exception"}, "status": 404})
+                    return self.answer(200, response)
+                if parts[0] == "_aliases" and method_ == "POST":
+                    server.calls["aliases"] += 1
+                    server.updateAliases(json.loads(body).get("actions", []))
+                    return self.answer(200, {"acknowledged": True})
+                if parts[0] == "_alias" and len(parts) == 2:
+                    server.calls["getAlias"] += 1
+                    indices = server.aliases.get(parts[1])
+                    if not indices:
+                        return self.answer(404, {"error": "alias [" + parts[1] + "] missing", "status": 404})
+                    return self.answer(200, {index: {"aliases": {parts[1]: {}}} for index in indices})
+
+                index = parts[0]
+                if len(parts) == 1 and method_ == "PUT":
+                    server.calls["createIndex"] += 1
+                    settings = json.loads(body).get("settings", {}) if body else {}
+                    mappings = json.loads(body).get("mappings") if body else None
+                    if not server.createIndex(index, settings.get("index", settings), mappings):
+                        return self.answer(400, {"error": {"type": "resource_already_exists_exception", "reason": "index [" + index + "] already exists"}, "status": 400})
+                    return self.answer(200, {"acknowledged": True, "index": index})
+                if len(parts) == 1 and method_ == "DELETE":
+                    server.calls["deleteIndex"] += 1
+                    if not server.deleteIndex(index):
+                        return self.answer(404, {"error": {"type": "index_not_found_exception", "reason": "no such index [" + index + "]"}, "status": 404})
+                    return self.answer(200, {"acknowledged": True})
+                if len(parts) == 2 and parts[1] == "_settings":
+                    server.calls["settings"] += 1
+                    concrete = server.resolve(index)
+                    if concrete not in server.settings:
+                        return self.answer(404, {"error": {"type": "index_not_found_exception", "reason": "no such index [" + index + "]"}, "status": 404})
+                    if method_ == "PUT":
+                        settings = json.loads(body)
+                        for k, v in settings.get("index", settings).items():
+                            if v is None:
+                                server.settings[concrete].pop(k, None)
+                            else:
+                                server.settings[concrete][k] = str(v)
+                        return self.answer(200, {"acknowledged": True})
+                    return self.answer(200, {concrete: {"settings": {"index": dict(server.settings[concrete])}}})
+                if len(parts) == 2 and parts[1] == "_mapping" and method_ == "GET":
+                    server.calls["getMapping"] += 1
+                    concrete = server.resolve(index)
+                    if concrete not in server.indices:
+                        return self.answer(404, {"error": {"type": "index_not_found_exception", "reason": "no such index [" + index + "]"}, "status": 404})
+                    return self.answer(200, {concrete: {"mappings": {"properties": server.mapping(concrete)}}})
+                if len(parts) == 2 and parts[1] == "_pit" and method_ == "POST":
+                    server.calls["openPit"] += 1
+                    with server.lock:
+                        pitID = "pit" + str(server.calls["openPit"])
+                        server.pointsInTime[pitID] = (server.mapping(index), list(server.documents(index).items()))
+                    return self.answer(200, {"id": pitID})
+                if len(parts) == 2 and parts[1] in ("_refresh", "_forcemerge"):
+                    server.calls[parts[1][1:]] += 1
+                    return self.answer(200, {"_shards": {"total": 1, "successful": 1, "failed": 0}})
+                if len(parts) == 3 and parts[1] == "_doc" and method_ in ("PUT", "POST"):
+                    server.calls["index"] += 1
+                    created = server.indexDocument(index, parts[2], json.loads(body))
+                    return self.answer(201 if created else 200, {"_index": index, "_id": parts[2], "result": "created" if created else "updated"})
+                if len(parts) == 3 and parts[1] == "_doc" and method_ == "GET":
+                    server.calls["get"] += 1
+                    doc = server.documents(index).get(parts[2])
+                    return self.answer(200 if doc is not None else 404, {"_index": index, "_id": parts[2], "found": doc is not None, "_source": doc})
+                if len(parts) == 3 and parts[1] == "_update":
+                    server.calls["update"] += 1
+                    if server.updateDocument(index, parts[2], json.loads(body).get("doc", {})):
+                        return self.answer(200, {"_index": index, "_id": parts[2], "result": "updated"})
+                    return self.answer(404, {"error": {"type": "document_missing_exception", "reason": "[_doc][" + parts[2] + "]: document missing"}, "status": 404})
+                if len(parts) == 2 and parts[1] == "_count":
+                    server.calls["count"] += 1
+                    return self.answer(200, {"count": len(server.documents(index))})
+                if len(parts) == 2 and parts[1] == "_search":
+                    server.calls["search"] += 1
+                    unsearchable = server.unsearchableFields(index, json.loads(body).get("query", {}) if body else {})
+                    if unsearchable:
+                        reason = "Cannot search on field [" + unsearchable[0] + "] since it is not indexed."
+                        return self.answer(400, {"error": {"type": "search_phase_execution_exception", "reason": reason, "root_cause": [{"type": "query_shard_exception", "reason": reason}]}, "status": 400})
+                    docs = list(server.documents(index).items())[:int(query.get("size", 10))]
+                    return self.answer(200, {"hits": {"total": {"value": len(server.documents(index))}, "hits": [{"_index": server.resolve(index), "_id": k, "_source": v} for k, v in docs]}})
+                return self.answer(400, {"error": {"type": "unsupported_operation", "reason": method_ + " " + self.path}, "status": 400})
+
+            def do_HEAD(self):
+                parts = [urlParse.unquote(p) for p in urlParse.urlsplit(self.path).path.strip("/").split("/") if p]
+                if not parts:
+                    found = True
+                elif parts[0] == "_alias" and len(parts) == 2:
+                    found = parts[1] in server.aliases
+                else:
+                    found = parts[0] in server.indices or parts[0] in server.aliases
+                self.send_response(200 if found else 404)
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                self.route("GET")
+
+            def do_POST(self):
+                self.route("POST")
+
+            def do_PUT(self):
+                self.route("PUT")
+
+            def do_DELETE(self):
+                self.route("DELETE")
+
+        return Handler
@@ -0,0 +1,324 @@
+from elasticsearch import Elasticsearch
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import json
+import queue
+import sys
+import threading
+from Indexer import Indexer
+from Instrumentation import metrics, getLogger
+
+log = getLogger("Exporter")
+
+FIELDS = ["id", "title", "date", "language", "url", "description", "rssOrigin", "content", "etag", "label", "predicted"]
+
+def parseDate(date_):
+    """
+    Parses a date as found in RSS feeds (RFC 822) or in Atom feeds (ISO 8601)
+    Returns
+    -------
+    datetime
+        the timezone aware date (UTC if the given one has no timezone), None if it could not be parsed
+    """
+    if isinstance(date_, datetime):
+        result = date_
+    elif not date_:
+        return None
+    else:
+        try:
+            result = parsedate_to_datetime(date_)
+        except (TypeError, ValueError, IndexError):
+            try:
+                result = datetime.fromisoformat(str(date_).strip().replace("Z", "+00:00"))
+            except ValueError:
+                return None
+    if result.tzinfo is None:
+        result = result.replace(tzinfo=timezone.utc)
+    return result
+
+class Exporter:
+    """Class used to stream the whole corpus, or a filtered slice of it, out of the ElasticSearch index or out of the pooled shelve
+    Records are produced and written batch by batch, so memory use does not depend on the size of the result
+    Attributes
+    ----------
+    language : str
+        Only the records in this language are exported, None to export all languages
+    label : str
+        Only the records carrying this label are exported, None to export all labels
+    rssOrigin : str
+        Only the records fetched from this RSS feed are exported, None to export all feeds
+    dateFrom : datetime
+        Only the records published at or after this date are exported, None for no lower bound
+    dateTo : datetime
+        Only the records published before this date are exported, None for no upper bound
+    fields : list
+        The exported fields, by default all of FIELDS
+    batchSize : int
+        The number of records of each batch (and of each ElasticSearch page)
+    """
+
+    def __init__(self, language_ = None, label_ = None, rssOrigin_ = None, dateFrom_ = None, dateTo_ = None, fields_ = None, batchSize_ = 1000):
+        """
+        Parameters
+        ----------
+        language_ : str, optional
+            The language of the exported records
+        label_ : str, optional
+            The label of the exported records
+        rssOrigin_ : str, optional
+            The RSS feed of the exported records
+        dateFrom_ : datetime or str, optional
+            The lower bound (included) of the publication date of the exported records
+        dateTo_ : datetime or str, optional
+            The upper bound (excluded) of the publication date of the exported records
+        fields_ : list, optional
+            The exported fields
+        batchSize_ : int, optional
+            The number of records of each batch
+        """
+        self.language = language_
+        self.label = label_
+        self.rssOrigin = rssOrigin_
+        self.dateFrom = parseDate(dateFrom_)
+        self.dateTo = parseDate(dateTo_)
+        self.fields = list(fields_) if fields_ else list(FIELDS)
+        self.batchSize = batchSize_
+
+    def matches(self, record_):
+        """
+        Returns True if the given record passes every filter
+        """
+        if self.language is not None and record_.get("language") != self.language:
+            return False
+        if self.rssOrigin is not None and record_.get("rssOrigin") != self.rssOrigin:
+            return False
+        if self.label is not None:
+            labels = record_.get("label")
+            if labels != self.label and not (isinstance(labels, (list, tuple)) and self.label in labels):
+                return False
+        if self.dateFrom is not None or self.dateTo is not None:
+            date = parseDate(record_.get("date"))
+            if date is None:
+                return False
+            if self.dateFrom is not None and date < self.dateFrom:
+                return False
+            if self.dateTo is not None and date >= self.dateTo:
+                return False
+        return True
+
+    def project(self, record_):
+        return {field: record_.get(field) for field in self.fields}
+
+    @staticmethod
+    def keywordField(field_, properties_):
+        """
+        Returns the name under which the given field can be filtered by a term query
+        Returns
+        -------
+        str
+            the field itself if it is mapped as keyword, its keyword sub-field if it is mapped as text (dynamic mapping), None if it has neither
+        """
+        mapped = properties_.get(field_, {})
+        if mapped.get("type") == "keyword":
+            return field_
+        for name, subField in mapped.get("fields", {}).items():
+            if subField.get("type") == "keyword":
+                return field_ + "." + name
+        return None
+
+    def query(self, properties_ = None):
+        """
+        Returns the ElasticSearch query of the keyword filters, the date filter is applied on the client side since dates are stored as they were given by the feeds
+        Parameters
+        ----------
+        properties_ : dict, optional
+            The mapping properties of the index, by default the ones of Indexer.mapping
+            A filter is only pushed down if its field can be matched exactly, the other filters are left to matches
+        """
+        properties = Indexer.mapping["properties"] if properties_ is None else properties_
+        filters = [
+            {"term": {Exporter.keywordField(field, properties): value}}
+            for field, value in (("language", self.language), ("label", self.label), ("rssOrigin", self.rssOrigin))
+            if value is not None and Exporter.keywordField(field, properties) is not None
+        ]
+        if not filters:
+            return {"match_all": {}}
+        return {"bool": {"filter": filters}}
+
+    def _batches(self, records_):
+        batch = []
+        for record in records_:
+            if self.matches(record):
+                batch.append(self.project(record))
+                if len(batch) >= self.batchSize:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def scanShelve(self, dataTableSrc_ = './FetcherDataPool/data.shelve'):
+        """
+        Iterates over the records of the given shelve, opened read only, entries are unpickled one at a time
+        Returns
+        -------
+        generator
+            the batches (lists of records) that pass the filters
+        """
+        def records(sourceDataTable_):
+            for pageID in sourceDataTable_:
+                record = Indexer.fields(sourceDataTable_[pageID])
+                record["id"] = pageID
+                record["predicted"] = None
+                yield record
+
+        sourceDataTable = Indexer._openSource(dataTableSrc_)
+        try:
+            yield from self._batches(records(sourceDataTable))
+        finally:
+            sourceDataTable.close()
+
+    def scanIndex(self, elasticSearchURL_ = 'localhost', elasticSearchPort_ = 9200, slices_ = 1, keepAlive_ = "5m"):
+        """
+        Iterates over the records of the index through a point in time and search_after, the point in time is split into slices read by parallel workers
+        Parameters
+        ----------
+        elasticSearchURL_ : str, optional
+            The url of the target ElasticSearch instance
+        elasticSearchPort_ : str, optional
+            The TCP port of the target ElasticSearch instance
+        slices_ : int, optional
+            The number of slices, each one is read by its own thread
+        keepAlive_ : str, optional
+            How long the point in time is kept between two pages
+        Returns
+        -------
+        generator
+            the batches (lists of records) that pass the filters
+        """
+        elasticSearch = Elasticsearch([{'host': elasticSearchURL_, 'port': elasticSearchPort_}])
+        # an index filled by fillIndexer has a dynamic mapping, where the filtered fields are text and must be matched through their keyword sub-field
+        mappings = [index["mappings"].get("properties", {}) for index in elasticSearch.indices.get_mapping(index=Indexer.indexName).values()]
+        properties = mappings[0] if len(mappings) == 1 else {}
+        pitID = elasticSearch.open_point_in_time(index=Indexer.indexName, keep_alive=keepAlive_)["id"]
+        # the fields used by the filters are fetched too, since matches is applied again on the client side
+        filtered = {"language": self.language, "label": self.label, "rssOrigin": self.rssOrigin, "date": self.dateFrom or self.dateTo}
+        source = [field for field in self.fields if field != "id"] + [field for field, value in filtered.items() if value is not None and field not in self.fields]
+        batches = queue.Queue(maxsize=2 * slices_)
+        stop = threading.Event()
+        done = object()
+
+        def readSlice(sliceID_):
+            try:
+                body = {
+                    "size": self.batchSize,
+                    "query": self.query(properties),
+                    "_source": source,
+                    "pit": {"id": pitID, "keep_alive": keepAlive_},
+                    "sort": [{"_shard_doc": "asc"}]
+                }
+                if slices_ > 1:
+                    body["slice"] = {"id": sliceID_, "max": slices_}
+                while not stop.is_set():
+                    with metrics.timed("es_call", operation="export_page", host=elasticSearchURL_):
+                        response = elasticSearch.search(body=body)
+                    hits = response["hits"]["hits"]
+                    if not hits:
+                        break
+                    records = []
+                    for hit in hits:
+                        record = hit["_source"]
+                        record["id"] = hit["_id"]
+                        records.append(record)
+                    batches.put(records)
+                    body["search_after"] = hits[-1]["sort"]
+                    body["pit"]["id"] = response.get("pit_id", body["pit"]["id"])
+            except Exception as e:
+                batches.put(e)
+            finally:
+                batches.put(done)
+
+        workers = [threading.Thread(target=readSlice, args=(i,), name="ExportSlice-" + str(i), daemon=True) for i in range(slices_)]
+        for worker in workers:
+            worker.start()
+
+        def records():
+            remaining = slices_
+            while remaining > 0:
+                item = batches.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield from item
+
+        try:
+            yield from self._batches(records())
+        finally:
+            stop.set()
+            # unblock the workers that are waiting for room in the queue
+            while any(worker.is_alive() for worker in workers):
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            elasticSearch.close_point_in_time(body={"id": pitID})
+            elasticSearch.close()
+
+    def write(self, batches_, output_ = "-", format_ = "jsonl"):
+        """
+        Writes the given batches as they come
+        Parameters
+        ----------
+        batches_ : iterable
+            The batches returned by scanShelve or scanIndex
+        output_ : str, optional
+            The destination file, "-" for the standard output
+        format_ : str, optional
+            "jsonl" for one JSON object per record, "columns" for one JSON object per batch holding a list of values per field, "parquet" for one Parquet row group per batch (requires pyarrow)
+        Returns
+        -------
+        int
+            the number of written records
+        """
+        if format_ == "parquet":
+            return self._writeParquet(batches_, output_)
+        if format_ not in ("jsonl", "columns"):
+            raise ValueError("unknown export format: " + str(format_))
+
+        fHandle = sys.stdout if output_ == "-" else open(output_, "w")
+        count = 0
+        try:
+            for batch in batches_:
+                if format_ == "jsonl":
+                    fHandle.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch))
+                else:
+                    fHandle.write(json.dumps({field: [record.get(field) for record in batch] for field in self.fields}, ensure_ascii=False) + "\n")
+                count += len(batch)
+                metrics.increment("records_exported", len(batch), format=format_)
+        finally:
+            if fHandle is not sys.stdout:
+                fHandle.close()
+        log.info("export done", extra={"fields": {"records": count, "format": format_, "output": output_}})
+        return count
+
+    def _writeParquet(self, batches_, output_):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("the parquet format requires pyarrow, please execute \"pip3 install pyarrow\" or use the columns format") from None
+
+        types = {"label": pa.list_(pa.string()), "predicted": pa.list_(pa.float64())}
+        schema = pa.schema([(field, types.get(field, pa.string())) for field in self.fields])
+        writer = pq.ParquetWriter(sys.stdout.buffer if output_ == "-" else output_, schema)
+        count = 0
+        try:
+            for batch in batches_:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                metrics.increment("records_exported", len(batch), format="parquet")
+        finally:
+            writer.close()
+        log.info("export done", extra={"fields": {"records": count, "format": "parquet", "output": output_}})
+        return count
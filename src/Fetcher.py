@@ -6,13 +6,17 @@ from hashlib import md5
 import shelve
 import feedparser
 from bs4 import BeautifulSoup
-from langdetect import detect
 from memory_tempfile import MemoryTempfile
 from distutils.dir_util import copy_tree
 import os
 from time import gmtime, strftime
 import http
+import logging
 import Vectoriser
+from LanguageIdentifier import LanguageIdentifier
+from Instrumentation import metrics, hostOf, getLogger
+
+log = getLogger("Fetcher")
 
 class Fetcher:
     """Class used to fetch and simplify (read stemmify and remove the stop words) the content pointed by an RSS feed into a python shelve
@@ -36,9 +40,11 @@ class Fetcher:
         The server's corrected URL response (HTTP 300 type of response) if the one given at initialisation is temporary
     labels: list
         The list of associated labels (useful for learning algorithms)
+    languageIdentifier : LanguageIdentifier
+        Identifies the language of the feed's items, keeps the running language prior of the feed
     """
 
-    def __init__(self, feedURL_, labels_, persistentFolder_ = "."):
+    def __init__(self, feedURL_, labels_, persistentFolder_ = ".", memoryFolder_ = None):
         """
         Parameters
         ----------
@@ -46,14 +52,19 @@ class Fetcher:
             The url of the RSS feed
         persistentFolder_: str, optional
             Location of the folder in which the content of the fetched feed should be save, default is "."
+        memoryFolder_: str, optional
+            Location of the folder hosted on system RAM in which the working copy is kept, default is the system's memory temporary directory
         """
 
         self.sourceFeed = feedURL_
         self.labels = labels_
+        self.languageIdentifier = LanguageIdentifier()
         self.id = str(md5(feedURL_.encode()).hexdigest())
         
         self.diskFolder = persistentFolder_ + '/' + self.id
-        self.memoryFolder = MemoryTempfile().gettempdir() + '/' + self.id
+        if memoryFolder_ is None:
+            memoryFolder_ = MemoryTempfile().gettempdir()
+        self.memoryFolder = memoryFolder_ + '/' + self.id
 
         try:
             os.mkdir(self.memoryFolder)
@@ -90,10 +101,7 @@ class Fetcher:
             fHandle.write("None\nNone\nNone")
             fHandle.close()
 
-        print("values read in info file for Fetcher " + self.id + " :")
-        print("\tcorrected url: " + str(self.correctedURL) + " " + str(type(self.correctedURL)))
-        print("\tcorrected last modified: " + str(self.lastModified) + " " + str(type(self.correctedURL)))
-        print("\tcorrected etag: " + str(self.etag) + " " + str(type(self.correctedURL)) + "\n")
+        log.debug("values read in info file", extra={"fields": {"fetcher": self.id, "feed": self.sourceFeed, "correctedURL": self.correctedURL, "lastModified": self.lastModified, "etag": self.etag}})
         
     def save(self):
         """
@@ -109,7 +117,7 @@ class Fetcher:
         copy_tree(self.diskFolder, self.memoryFolder)
 
     def getPageContent(self, url_):
-        """ returns the given URL's associated content in string form, if it already exists in the shelve, updates the associated shelve
+        """ returns the given URL's associated content in string form along with the page's declared language, if it already exists in the shelve, updates the associated shelve
         Parameters
         ----------
         url_ : str
@@ -117,7 +125,8 @@ class Fetcher:
 
         Returns
         -------
-        str
+        tuple
+            The content of the page and the lang attribute of its <html> element (or the already known language of the item), both may be None
         """
         def tagVisible(element_):
             if element_.parent.name in ['style', 'script', 'head', 'title', 'meta', '[document]']:
@@ -125,37 +134,47 @@ class Fetcher:
             return True
 
         def textFromHtml(body_):
-            soup = BeautifulSoup(body_, 'html.parser')
-            texts = soup.findAll(text=True)
-            visibleTexts = filter(tagVisible, texts)
-            return u" ".join(t.strip() for t in visibleTexts)
+            with metrics.timed("html_extraction", feed=self.sourceFeed, host=host):
+                soup = BeautifulSoup(body_, 'html.parser')
+                texts = soup.findAll(text=True)
+                visibleTexts = filter(tagVisible, texts)
+                pageLanguage = soup.html.get('lang') if soup.html is not None else None
+                return u" ".join(t.strip() for t in visibleTexts), pageLanguage
 
         url = list(urlParse.urlsplit(url_))
         url[2] = urlParse.quote(url[2])
         url = urlParse.urlunsplit(url)
-        
+        host = hostOf(url)
 
         result = ""
         itemID = md5(url.encode()).hexdigest()
         if itemID in self.shelveHandler:
-            print("updating " + url)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("updating page", extra={"fields": {"feed": self.sourceFeed, "url": url}})
             self.updateItem(md5(url.encode()).hexdigest())
-            result = self.shelveHandler[itemID][6]
+            itemData = self.shelveHandler[itemID]
+            return (itemData[6], itemData[5])
         else:
-            print("dowloading " + url)
-            try:
-                tempFile = urllib.request.urlopen(url)
-                result = tempFile.read()
-            except (urllib.error.HTTPError, urllib.error.URLError, http.client.RemoteDisconnected):
-                return None
-            except http.client.InvalidURL:
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("downloading page", extra={"fields": {"feed": self.sourceFeed, "url": url}})
+            with metrics.timed("page_download", feed=self.sourceFeed, host=host):
                 try:
-                    tempFile = urllib.request.urlopen(url_.replace(' ', "%20"))
+                    tempFile = urllib.request.urlopen(url)
                     result = tempFile.read()
-                except:
-                    return None
-            result = textFromHtml(result)
-        return result
+                except (urllib.error.HTTPError, urllib.error.URLError, http.client.RemoteDisconnected) as e:
+                    metrics.increment("page_download_errors", feed=self.sourceFeed, host=host)
+                    log.info("page download failed", extra={"fields": {"feed": self.sourceFeed, "url": url, "error": repr(e)}})
+                    return (None, None)
+                except http.client.InvalidURL:
+                    try:
+                        tempFile = urllib.request.urlopen(url_.replace(' ', "%20"))
+                        result = tempFile.read()
+                    except Exception as e:
+                        metrics.increment("page_download_errors", feed=self.sourceFeed, host=host)
+                        log.info("page download failed", extra={"fields": {"feed": self.sourceFeed, "url": url, "error": repr(e)}})
+                        return (None, None)
+            metrics.increment("page_download_bytes", len(result), feed=self.sourceFeed, host=host)
+        return textFromHtml(result)
     
     def updateItem(self, itemID_):
         """Updates the content associated with the given id in the object's shelve if it exists. May or may not redownload the content of the target webpage
@@ -175,13 +194,17 @@ class Fetcher:
             request = str(itemData[1])
 
         try: 
-            urlHandle = urllib.request.urlopen(request)
-            sourcePageContent = urlHandle.read()
+            with metrics.timed("page_update", feed=self.sourceFeed, host=hostOf(itemData[1])):
+                urlHandle = urllib.request.urlopen(request)
+                sourcePageContent = urlHandle.read()
             date = urlHandle.info().get("Last-Modified")
             etag = urlHandle.info().get("ETag")
-            self.shelveHandler[itemID_] = (*itemData[:6], Vectoriser.simplify(u" ".join(item for item in (itemData[3], itemData[4], itemData[6]) if item), itemData[5]), etag, self.labels, None)
+            with metrics.timed("simplify", feed=self.sourceFeed, language=itemData[5]):
+                content = Vectoriser.simplify(u" ".join(item for item in (itemData[3], itemData[4], itemData[6]) if item), itemData[5])
+            with metrics.timed("shelve_write", feed=self.sourceFeed):
+                self.shelveHandler[itemID_] = (*itemData[:6], content, etag, self.labels, None)
         except (urllib.error.HTTPError, urllib.error.URLError):
-            pass
+            metrics.increment("page_update_errors", feed=self.sourceFeed, host=hostOf(itemData[1]))
 
     def translateToItemObject(self, rssPost_):
         """ Returns an object that contains the URL's associated content on top of surrounding data
@@ -225,7 +248,7 @@ class Fetcher:
             rssPost_.get('updated'),
             strftime("%a, %d %b %Y %H:%M:%S GMT", gmtime())
         )
-        sourcePageContent = self.getPageContent(webPageOrigin)
+        sourcePageContent, pageLanguage = self.getPageContent(webPageOrigin)
 
         if self.correctedURL is None:
             sourceFeedURL = self.sourceFeed
@@ -237,13 +260,13 @@ class Fetcher:
             rssPost_.get('summary'),
             rssPost_.get('title_detail').value
         )
-        try:
-            language = detect(tryFindNotNone(description, title))
-        except:
-            language = None
+        with metrics.timed("language_detection", feed=self.sourceFeed):
+            language = self.languageIdentifier.identify(tryFindNotNone(description, title), pageLanguage)
 
         etag = rssPost_.get('etag')
-        return (identificator, sourceFeedURL, webPageOrigin, date, title, description, language, Vectoriser.simplify(u" ".join(item for item in (title, description, sourcePageContent) if item), language), etag, self.labels, None)
+        with metrics.timed("simplify", feed=self.sourceFeed, language=language):
+            content = Vectoriser.simplify(u" ".join(item for item in (title, description, sourcePageContent) if item), language)
+        return (identificator, sourceFeedURL, webPageOrigin, date, title, description, language, content, etag, self.labels, None)
 
     def fetchRssFeed(self, closeShelveOnCompletion_=True):
         """ Creates or opens the shelve associated with the targeted RSS feed, and completes it with new or updated web pages given by said feed
@@ -256,25 +279,23 @@ class Fetcher:
         tuple
             The location of the memory folder, the location of the persistent folder and the corrected URL if the server associated with the RSS feed sent one
         """
-        print("\n")
-        print(self.sourceFeed)
+        log.info("fetching feed", extra={"fields": {"feed": self.sourceFeed}})
         try:
-            if self.correctedURL is None:
-                d = feedparser.parse(self.sourceFeed, modified=self.lastModified, etag=self.etag)
-            else:
-                d = feedparser.parse(self.correctedURL, modified=self.lastModified, etag=self.etag)
+            with metrics.timed("feed_fetch", feed=self.sourceFeed, host=hostOf(self.correctedURL or self.sourceFeed)):
+                if self.correctedURL is None:
+                    d = feedparser.parse(self.sourceFeed, modified=self.lastModified, etag=self.etag)
+                else:
+                    d = feedparser.parse(self.correctedURL, modified=self.lastModified, etag=self.etag)
         except urllib.error.URLError:
-            print("The URL is invalid, giving up ...")
+            metrics.increment("feed_errors", feed=self.sourceFeed)
+            log.warning("invalid feed URL, giving up", extra={"fields": {"feed": self.sourceFeed}})
             fh = open(self.memoryFolder + '/' + "lastID", "w+")
             fh.write("400")
             fh.close()
             return (self.memoryFolder, self.diskFolder, self.correctedURL)
 
-        print("corrected url: " + str(self.correctedURL))
-        print("RSS feed last-modified: " + str(d.get("modified")))
-        print("RSS feed etag: " + str(d.get("etag")))
-
-        print("response code from feed: ", d.get("status"))
+        metrics.increment("feed_responses", feed=self.sourceFeed, status=d.get("status"))
+        log.debug("feed response", extra={"fields": {"feed": self.sourceFeed, "status": d.get("status"), "correctedURL": self.correctedURL, "lastModified": d.get("modified"), "etag": d.get("etag"), "entries": len(d.entries)}})
 
         if d.get("status") is not None and d.get("status") >= 400:
             fh = open(self.memoryFolder + '/' + "lastID", "w+")
@@ -283,13 +304,17 @@ class Fetcher:
             self.shelveHandler.close()
         else:
             if d.get("status") is not None and (d.get("status") == 301 or d.get("status") == 308):
-                print("RSS feed redirected to ", d.get("href"))
+                log.info("feed redirected", extra={"fields": {"feed": self.sourceFeed, "href": d.get("href")}})
                 self.correctedURL = d.get("href")
 
+            self.languageIdentifier.setFeedLanguage(d.get("feed", {}).get("language"))
+
             for post in d.entries:  # TODO restriction à enlever
                 test = self.translateToItemObject(post)
                 if test is not None:
-                    self.shelveHandler[test[0]] = test[1:]
+                    with metrics.timed("shelve_write", feed=self.sourceFeed):
+                        self.shelveHandler[test[0]] = test[1:]
+                    metrics.increment("items_stored", feed=self.sourceFeed, language=test[6])
 
             if closeShelveOnCompletion_:
                 self.shelveHandler.close()
@@ -5,6 +5,9 @@ from distutils.dir_util import copy_tree
 import os
 import shelve
 import shutil
+from Instrumentation import metrics, getLogger
+
+log = getLogger("FetcherPool")
 
 class FetcherPool:
     """Class used to fetch and store multiple RSS feeds at once into a single shelve
@@ -19,18 +22,24 @@ class FetcherPool:
     shelveHandler : DbfilenameShelf
     """
 
-    def __init__(self, rssFeedUrlList_, persistentFld_ = "."):
+    def __init__(self, rssFeedUrlList_, persistentFld_ = ".", memoryFld_ = None):
         """
         Parameters
         ----------
         rssFeedUrlList_ : list
             The list of RSS feeds that the instance must handle, with their associated labels, each element must be [rssURLstrin, label1, label2, ...]
+        persistentFld_ : str, optional
+            Location of the folder in which the fetched and merged content is saved, default is "."
+        memoryFld_ : str, optional
+            Location of the folder hosted on system RAM used as working copy, default is the system's memory temporary directory
         """
+        if memoryFld_ is None:
+            memoryFld_ = MemoryTempfile().gettempdir()
 
-        self.fetcherList = list(map(lambda link: Fetcher(link[0], link[1:], persistentFolder_=persistentFld_), rssFeedUrlList_))
+        self.fetcherList = list(map(lambda link: Fetcher(link[0], link[1:], persistentFolder_=persistentFld_, memoryFolder_=memoryFld_), rssFeedUrlList_))
 
         self.diskFolder = persistentFld_ + '/FetcherDataPool'
-        self.memoryFolder = MemoryTempfile().gettempdir() + '/FetcherDataPool'
+        self.memoryFolder = memoryFld_ + '/FetcherDataPool'
 
         try:
             os.mkdir(self.memoryFolder)
@@ -49,10 +58,10 @@ class FetcherPool:
         Parameters
         ----------
         multithreaded_ : bool, optional
-            If True, each Fetcher will be launched in parallel, note that prints to console will get chaotic
+            If True, each Fetcher will be launched in parallel, log records are then tagged with the name of their thread
         """
         if multithreaded_:
-            threadList = list(map(lambda fetcher: threading.Thread(target=fetcher.fetchRssFeed, args=(False,)), self.fetcherList))
+            threadList = list(map(lambda fetcher: threading.Thread(target=fetcher.fetchRssFeed, args=(False,), name="Fetcher-" + fetcher.id[:8]), self.fetcherList))
 
             for th in threadList:
                 th.start()
@@ -62,7 +71,7 @@ class FetcherPool:
         else:
             for fetcher in self.fetcherList:
                 fetcher.fetchRssFeed()
-        print("ALL DONE")
+        log.info("all feeds fetched", extra={"fields": {"fetchers": len(self.fetcherList), "multithreaded": multithreaded_}})
         
     def joinAllData(self):
         """Merges all of the instance's Fetcher's shelves into a single shelve
@@ -82,12 +91,15 @@ class FetcherPool:
                 except FileNotFoundError:
                     fLength = 0
             if fLength > 0:
-                for key in shHandler:
-                    try:
-                        self.shelveHandler[key] = shHandler[key]
-                    except EOFError:
-                        del self.shelveHandler[key]
-                        print("An element could not be saved for some reason (FetcherPool.py, line 89)")
+                with metrics.timed("merge", feed=fetcher.sourceFeed):
+                    for key in shHandler:
+                        try:
+                            self.shelveHandler[key] = shHandler[key]
+                            metrics.increment("items_merged", feed=fetcher.sourceFeed)
+                        except EOFError:
+                            del self.shelveHandler[key]
+                            metrics.increment("merge_errors", feed=fetcher.sourceFeed)
+                            log.warning("an element could not be merged", extra={"fields": {"feed": fetcher.sourceFeed, "key": key}})
             shHandler.close()
             
         return self.shelveHandler
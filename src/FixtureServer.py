@@ -0,0 +1,212 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email.utils import formatdate
+from hashlib import md5
+from xml.sax.saxutils import escape
+import random
+import threading
+import time
+
+WORDS = {
+    "fr": "le la les un une des et est dans pour sur avec par pas plus mais comme nous vous ils gouvernement ministre président économie marché entreprise emploi croissance élection assemblée loi réforme budget santé hôpital école université match équipe championnat victoire saison ville région pays europe monde année semaine jour".split(),
+    "en": "the a an and is in for on with by not more but as we you they government minister president economy market company jobs growth election parliament law reform budget health hospital school university match team league victory season city region country europe world year week day".split()
+}
+
+LABELS = {
+    "ECO": "inflation bourse banque euro taux dette bank stocks rates debt trade".split(),
+    "POLITIC": "sénat député parti vote campagne senate deputy party vote campaign".split(),
+    "SPORT": "but joueur entraîneur stade coupe goal player coach stadium cup".split()
+}
+
+class FixtureServer:
+    """Class used to serve synthetic RSS feeds and article pages on a local HTTP server, so that Fetcher and FetcherPool can be benchmarked offline
+    Feeds are served at /feed/<feedNumber>.xml, pages at /page/<feedNumber>/<itemNumber>.html and redirected feeds at /moved/<feedNumber>.xml
+    Attributes
+    ----------
+    feedCount : int
+        The number of served RSS feeds
+    itemsPerFeed : int
+        The number of items of each RSS feed
+    pageWords : int
+        The number of words of each article page
+    latency : float
+        The delay (in seconds) added before answering each request
+    notModified : bool
+        If True, the feeds answer 304 when the request's ETag or Last-Modified date matches
+    redirectShare : float
+        The share of feeds that are listed under a URL answering 301 towards their actual URL
+    frenchShare : float
+        The share of feeds written in french, the others are written in english
+    requestCount : int
+        The number of requests answered so far
+    """
+
+    def __init__(self, feedCount_ = 20, itemsPerFeed_ = 20, pageWords_ = 400, latency_ = 0.0, notModified_ = True, redirectShare_ = 0.1, frenchShare_ = 0.5, seed_ = 0):
+        """
+        Parameters
+        ----------
+        feedCount_ : int, optional
+            The number of served RSS feeds
+        itemsPerFeed_ : int, optional
+            The number of items of each RSS feed
+        pageWords_ : int, optional
+            The number of words of each article page
+        latency_ : float, optional
+            The delay (in seconds) added before answering each request
+        notModified_ : bool, optional
+            If True, the feeds answer 304 when they are requested again with their ETag or Last-Modified date
+        redirectShare_ : float, optional
+            The share of feeds listed under a URL answering 301
+        frenchShare_ : float, optional
+            The share of feeds written in french
+        seed_ : int, optional
+            The seed of the generated content
+        """
+        self.feedCount = feedCount_
+        self.itemsPerFeed = itemsPerFeed_
+        self.pageWords = pageWords_
+        self.latency = latency_
+        self.notModified = notModified_
+        self.redirectShare = redirectShare_
+        self.frenchShare = frenchShare_
+        self.seed = seed_
+        self.requestCount = 0
+        self.lock = threading.Lock()
+        self.lastModified = formatdate(usegmt=True)
+
+        rnd = random.Random(seed_)
+        self.feeds = [
+            ("fr" if rnd.random() < frenchShare_ else "en", rnd.choice(list(LABELS)), rnd.random() < redirectShare_)
+            for _ in range(feedCount_)
+        ]
+
+        self.httpServer = ThreadingHTTPServer(("127.0.0.1", 0), self._handlerClass())
+        self.httpServer.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:" + str(self.httpServer.server_address[1])
+
+    def feedList(self):
+        """
+        Returns the served feeds in the format expected by FetcherPool
+        Returns
+        -------
+        list
+            Each element is [rssURL, label]
+        """
+        return [
+            [self.url + ("/moved/" if redirected else "/feed/") + str(n) + ".xml", label]
+            for n, (_, label, redirected) in enumerate(self.feeds)
+        ]
+
+    def start(self):
+        """
+        Starts serving in a background thread
+        """
+        self.thread = threading.Thread(target=self.httpServer.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops serving and releases the socket
+        """
+        self.httpServer.shutdown()
+        self.httpServer.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args_):
+        self.stop()
+
+    def etag(self, feedNumber_):
+        return '"' + md5((str(self.seed) + "/" + str(feedNumber_)).encode()).hexdigest() + '"'
+
+    def text(self, lang_, label_, wordCount_, seed_):
+        rnd = random.Random(seed_)
+        vocabulary = WORDS[lang_] * 3 + LABELS[label_]
+        return " ".join(rnd.choice(vocabulary) for _ in range(wordCount_))
+
+    def feedBody(self, feedNumber_):
+        lang, label, _ = self.feeds[feedNumber_]
+        items = []
+        for i in range(self.itemsPerFeed):
+            seed = feedNumber_ * 100003 + i
+            items.append(
+                "<item><title>" + escape(self.text(lang, label, 8, seed)) + "</title>"
+                + "<link>" + self.url + "/page/" + str(feedNumber_) + "/" + str(i) + ".html</link>"
+                + "<description>" + escape(self.text(lang, label, 30, -seed)) + "</description>"
+                + "<pubDate>" + self.lastModified + "</pubDate></item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            + "<title>feed " + str(feedNumber_) + "</title><link>" + self.url + "</link>"
+            + "<language>" + lang + "</language>"
+            + "".join(items) + "</channel></rss>"
+        )
+
+    def pageParagraphs(self, feedNumber_, itemNumber_):
+        """
+        Returns the paragraphs of the visible text of the given page
+        """
+        lang, label, _ = self.feeds[feedNumber_]
+        return [
+            self.text(lang, label, 50, (feedNumber_ * 100003 + itemNumber_) * 1000 + p)
+            for p in range(max(1, self.pageWords // 50))
+        ]
+
+    def pageBody(self, feedNumber_, itemNumber_):
+        lang, _, _ = self.feeds[feedNumber_]
+        return (
+            '<!DOCTYPE html><html lang="' + lang + '"><head><title>page</title><script>var x = 1;</script></head><body>'
+            + "".join("<p>" + escape(p) + "</p>" for p in self.pageParagraphs(feedNumber_, itemNumber_)) + "</body></html>"
+        )
+
+    def _handlerClass(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, *args_):
+                pass
+
+            def answer(self, status_, body_ = None, contentType_ = "text/html; charset=utf-8", headers_ = None):
+                self.send_response(status_)
+                for k, v in (headers_ or {}).items():
+                    self.send_header(k, v)
+                if body_ is not None:
+                    body = body_.encode()
+                    self.send_header("Content-Type", contentType_)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+
+            def do_GET(self):
+                with server.lock:
+                    server.requestCount += 1
+                if server.latency > 0:
+                    time.sleep(server.latency)
+                parts = self.path.split("?")[0].strip("/").split("/")
+                try:
+                    if parts[0] == "moved" and len(parts) == 2:
+                        self.answer(301, headers_={"Location": server.url + "/feed/" + parts[1]})
+                    elif parts[0] == "feed" and len(parts) == 2:
+                        feedNumber = int(parts[1].split(".")[0])
+                        etag = server.etag(feedNumber)
+                        if server.notModified and (self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == server.lastModified):
+                            self.answer(304, headers_={"ETag": etag})
+                        else:
+                            self.answer(200, server.feedBody(feedNumber), "application/rss+xml; charset=utf-8", {"ETag": etag, "Last-Modified": server.lastModified})
+                    elif parts[0] == "page" and len(parts) == 3:
+                        self.answer(200, server.pageBody(int(parts[1]), int(parts[2].split(".")[0])), headers_={"Last-Modified": server.lastModified})
+                    else:
+                        self.answer(404, "not found")
+                except (ValueError, IndexError):
+                    self.answer(404, "not found")
+
+        return Handler
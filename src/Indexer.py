@@ -1,4 +1,4 @@
-from elasticsearch import Elasticsearch, exceptions as ESexcept
+from elasticsearch import Elasticsearch, exceptions as ESexcept, helpers as ESHelpers
 import requests
 from hashlib import md5
 import shelve
@@ -7,6 +7,11 @@ from memory_tempfile import MemoryTempfile
 import Vectoriser
 from joblib import load
 from collections import Counter
+from time import gmtime, strftime
+from Instrumentation import metrics, getLogger
+import logging
+
+log = getLogger("Indexer")
 
 class Indexer:
     """Class used to index the content of a given shelve into ElasticSearch
@@ -14,8 +19,91 @@ class Indexer:
     ----------
     sourceDataTable : DbfilenameShelf
     elasticSearch : Elasticsearch
+    indexName : str
+        [CLASS ATTRIBUTE] The name under which the documents are indexed and searched, an alias once rebuild has been used
+    mapping : dict
+        [CLASS ATTRIBUTE] The explicit mapping of the indices created by rebuild
     """
 
+    indexName = 'rssi'
+
+    mapping = {
+        "properties": {
+            "title": {"type": "text"},
+            "date": {"type": "keyword"},
+            "language": {"type": "keyword"},
+            "url": {"type": "keyword"},
+            "description": {"type": "text"},
+            "rssOrigin": {"type": "keyword"},
+            "content": {"type": "text"},
+            "etag": {"type": "keyword"},
+            "label": {"type": "keyword"},
+            "predicted": {"type": "float"}
+        }
+    }
+
+    @staticmethod
+    def _loadModel():
+        """
+        Returns the trained model and its vectoriser, exits if they were not trained yet
+        """
+        log.info("loading model")
+        try:
+            model = load("./content/trainedModel.joblib")
+            vecto = load("./content/vectorizer.joblib")
+        except:
+            log.error("could not load trained model, please execute \"make updateModel\"")
+            exit()
+        return model, vecto
+
+    @staticmethod
+    def _openSource(dataTableSrc_):
+        """
+        Opens the given shelve read only, or the shelve of the same name in the default memory folder, exits if neither exists
+        """
+        try:
+            return shelve.open(dataTableSrc_, flag='r')
+        except dbmerr:
+            log.warning("origin shelve not found in default or specified directory, attempting from default memory folder", extra={"fields": {"shelve": dataTableSrc_}})
+            try:
+                memF = MemoryTempfile().gettempdir() + "/".join(dataTableSrc_.rsplit("/", 2)[1:])
+                return shelve.open(memF, flag='r')
+            except dbmerr:
+                log.error("origin shelve not found in default memory folder either")
+                exit()
+
+    @staticmethod
+    def fields(pageValue_):
+        """
+        Returns the named fields of the given shelve entry, as they are indexed
+        """
+        return {
+            "title": pageValue_[3],
+            "date": pageValue_[2],
+            "language": pageValue_[5],
+            "url": pageValue_[1],
+            "description": pageValue_[4],
+            "rssOrigin": pageValue_[0],
+            "content": pageValue_[6],
+            "etag": pageValue_[7],
+            "label": pageValue_[8]
+        }
+
+    @staticmethod
+    def _document(pageValue_, model_, vecto_):
+        """
+        Returns the ElasticSearch document of the given shelve entry, along with its guessed label probabilities
+        """
+        with metrics.timed("classification", language=pageValue_[5]):
+            predicted = model_.predict_proba(
+                vecto_.transform([
+                    Counter(pageValue_[6].split(' '))
+                ])
+            )
+        doc = Indexer.fields(pageValue_)
+        doc["predicted"] = [float(p) for p in predicted[0]]
+        return doc
+
     @staticmethod
     def fill(dataTableSrc_='./FetcherDataPool/data.shelve', elasticSearchURL_ = 'localhost', elasticSearchPort_ = 9200):
         """ [STATIC METHOD] The targeted ElasticSearch instance is filled with the content of the targeted shelve during initialisation.
@@ -30,57 +118,135 @@ class Indexer:
             The TCP port of the target ElasticSearch instance
         """
         res = requests.get("http://" + elasticSearchURL_ + ":" + str(elasticSearchPort_))
-        print("response from ElasticSearch server:\n", str(res.content, "utf-8"), "\n\n")
-
-        print("loading model ...")
-        try:
-            model = load("./content/trainedModel.joblib")
-            vecto = load("./content/vectorizer.joblib")
-        except:
-            print("could not load trained model, please execute \"make updateModel\"")
-            exit()
+        log.debug("response from ElasticSearch server", extra={"fields": {"response": str(res.content, "utf-8")}})
 
-        try:
-            sourceDataTable = shelve.open(dataTableSrc_, flag='r')
-        except dbmerr:
-            print("Origin shelve not found in default or specified directory")
-            print("Attempting from default memory folder")
-            try:
-                memF = MemoryTempfile().gettempdir() + "/".join(dataTableSrc_.rsplit("/", 2)[1:])
-                sourceDataTable = shelve.open(memF, flag='r')
-            except dbmerr:
-                print("Failed.")
-                exit()
+        model, vecto = Indexer._loadModel()
+        sourceDataTable = Indexer._openSource(dataTableSrc_)
 
         elasticSearch = Elasticsearch([{'host': elasticSearchURL_, 'port': elasticSearchPort_}])
         
-        print("Indexing Data ...")
+        log.info("indexing data")
         for (pageID,pageValue) in sourceDataTable.items():
-            doc = {
-                "title": pageValue[3],
-                "date": pageValue[2],
-                "language": pageValue[5],
-                "url": pageValue[1],
-                "description": pageValue[4],
-                "rssOrigin": pageValue[0],
-                "content": pageValue[6],
-                "etag": pageValue[7],
-                "label": pageValue[8],
-                "predicted": model.predict_proba(
-                    vecto.transform([
-                        Counter(pageValue[6].split(' '))
-                    ])
-                )
-            }
+            doc = Indexer._document(pageValue, model, vecto)
             try:
-                elasticSearch.update(index='rssi', id=pageID, body={"doc": doc})
-                print("updating " + str(doc["url"]))
+                with metrics.timed("es_call", operation="update", host=elasticSearchURL_):
+                    elasticSearch.update(index=Indexer.indexName, id=pageID, body={"doc": doc})
+                metrics.increment("documents_updated", index=Indexer.indexName)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("document updated", extra={"fields": {"id": pageID, "url": doc["url"]}})
             except ESexcept.NotFoundError:
-                elasticSearch.index(index='rssi',id=pageID, body=doc)
-                print("indexing " + str(doc["url"]))
+                with metrics.timed("es_call", operation="index", host=elasticSearchURL_):
+                    elasticSearch.index(index=Indexer.indexName, id=pageID, body=doc)
+                metrics.increment("documents_indexed", index=Indexer.indexName)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("document indexed", extra={"fields": {"id": pageID, "url": doc["url"]}})
         
         sourceDataTable.close()
-        print("Done.")
+        log.info("indexing done")
+
+    @staticmethod
+    def rebuild(dataTableSrc_='./FetcherDataPool/data.shelve', elasticSearchURL_ = 'localhost', elasticSearchPort_ = 9200, chunkSize_ = 500, keepOldIndices_ = False):
+        """ [STATIC METHOD] Rebuilds the whole index from the targeted shelve without interrupting searches.
+        A new versioned index (rssi-<timestamp>) is created with an explicit mapping, refresh and replicas are turned off while it is bulk loaded,
+        then it is force merged, its settings are restored and the rssi alias is atomically moved onto it.
+        If rssi is still a plain index (as created by fill), it is replaced by the alias in the same atomic operation
+        If a document cannot be indexed or a step fails, the new index is deleted, the alias is left untouched and the error is raised
+        Parameters
+        ----------
+        dataTableSrc_ : str, optional
+            The location of the target shelve
+        elasticSearchURL_ : str, optional
+            The url of the target ElasticSearch instance
+        elasticSearchPort_ : str, optional
+            The TCP port of the target ElasticSearch instance
+        chunkSize_ : int, optional
+            The number of documents sent in each bulk request
+        keepOldIndices_ : bool, optional
+            If False, the indices that were behind the alias are deleted once it has been moved
+        Returns
+        -------
+        str
+            The name of the new index
+        """
+        model, vecto = Indexer._loadModel()
+        sourceDataTable = Indexer._openSource(dataTableSrc_)
+
+        elasticSearch = Elasticsearch([{'host': elasticSearchURL_, 'port': elasticSearchPort_}])
+
+        if elasticSearch.indices.exists_alias(name=Indexer.indexName):
+            oldIndices = list(elasticSearch.indices.get_alias(name=Indexer.indexName).keys())
+            plainIndex = False
+        elif elasticSearch.indices.exists(index=Indexer.indexName):
+            oldIndices = [Indexer.indexName]
+            plainIndex = True
+        else:
+            oldIndices = []
+            plainIndex = False
+
+        replicas = 1
+        if oldIndices:
+            oldSettings = elasticSearch.indices.get_settings(index=oldIndices[0])
+            replicas = int(next(iter(oldSettings.values()))["settings"]["index"].get("number_of_replicas", 1))
+
+        newIndex = Indexer.indexName + "-" + strftime("%Y%m%d%H%M%S", gmtime())
+        log.info("creating index", extra={"fields": {"index": newIndex, "previous": oldIndices}})
+        elasticSearch.indices.create(index=newIndex, body={
+            "settings": {"number_of_replicas": 0, "refresh_interval": "-1"},
+            "mappings": Indexer.mapping
+        })
+
+        def actions():
+            for (pageID, pageValue) in sourceDataTable.items():
+                yield {"_index": newIndex, "_id": pageID, "_source": Indexer._document(pageValue, model, vecto)}
+
+        log.info("bulk loading data", extra={"fields": {"index": newIndex, "chunkSize": chunkSize_}})
+        indexed = 0
+        failed = []
+        try:
+            with metrics.timed("es_call", operation="bulk_load", host=elasticSearchURL_):
+                for ok, item in ESHelpers.streaming_bulk(elasticSearch, actions(), chunk_size=chunkSize_, raise_on_error=False):
+                    if ok:
+                        indexed += 1
+                    else:
+                        failed.append(item)
+                        log.warning("document could not be indexed", extra={"fields": {"index": newIndex, "item": item}})
+            metrics.increment("documents_indexed", indexed, index=newIndex)
+            metrics.increment("bulk_errors", len(failed), index=newIndex)
+            if failed:
+                # a partial index must never replace the one currently served
+                raise ESHelpers.BulkIndexError(str(len(failed)) + " document(s) could not be indexed", failed)
+
+            with metrics.timed("es_call", operation="forcemerge", host=elasticSearchURL_):
+                elasticSearch.indices.refresh(index=newIndex)
+                elasticSearch.indices.forcemerge(index=newIndex, max_num_segments=1, request_timeout=3600)
+            elasticSearch.indices.put_settings(index=newIndex, body={"index": {"number_of_replicas": replicas, "refresh_interval": None}})
+
+            aliasActions = [{"add": {"index": newIndex, "alias": Indexer.indexName}}]
+            if plainIndex:
+                aliasActions.append({"remove_index": {"index": Indexer.indexName}})
+            else:
+                aliasActions = [{"remove": {"index": index, "alias": Indexer.indexName}} for index in oldIndices] + aliasActions
+            with metrics.timed("es_call", operation="alias_swap", host=elasticSearchURL_):
+                elasticSearch.indices.update_aliases(body={"actions": aliasActions})
+        except Exception:
+            log.error("rebuild failed, the current index is kept and the new one is deleted", exc_info=True, extra={"fields": {"index": newIndex, "documents": indexed, "errors": len(failed)}})
+            try:
+                elasticSearch.indices.delete(index=newIndex, ignore_unavailable=True)
+            except ESexcept.ElasticsearchException:
+                log.error("could not delete the new index, please delete it manually", extra={"fields": {"index": newIndex}})
+            elasticSearch.close()
+            raise
+        finally:
+            sourceDataTable.close()
+        log.info("alias moved", extra={"fields": {"alias": Indexer.indexName, "index": newIndex, "documents": indexed}})
+
+        if not keepOldIndices_ and not plainIndex:
+            for index in oldIndices:
+                elasticSearch.indices.delete(index=index)
+                log.info("old index deleted", extra={"fields": {"index": index}})
+
+        elasticSearch.close()
+        return newIndex
 
     def __init__(self, elasticSearchURL_ = 'localhost', elasticSearchPort_ = 9200):
         """
@@ -123,7 +289,7 @@ class Indexer:
                         self.elasticSearch.close()
                         print("\nElasticSearch Client closed, search app exit successfull")
                         raise SystemExit from KeyboardInterrupt
-                queryResponse = self.elasticSearch.search(body={"query":{"match": {queryType: queryContent}}})
+                queryResponse = self.elasticSearch.search(index=Indexer.indexName, body={"query":{"match": {queryType: queryContent}}})
             else:
                 try:
                     query = input("Enter search: ")
@@ -132,7 +298,7 @@ class Indexer:
                     self.elasticSearch.close()
                     print("\nElasticSearch Client closed, search app exit successfull")
                     raise SystemExit from KeyboardInterrupt
-                queryResponse = self.elasticSearch.search(body={
+                queryResponse = self.elasticSearch.search(index=Indexer.indexName, body={
                     "query": {
                         "multi_match" : {
                             "query":    queryContent,
@@ -145,7 +311,10 @@ class Indexer:
                 
                 result = list(map(lambda elem: {val:elem['_source'][val]  for val in elem['_source'] if val !="content"}, queryResponse['hits']['hits'])) # dégager le contenu de page
                 for elem in result:
-                    elem["predicted"] = list(zip(model.classes_, elem["predicted"][0]))
+                    predicted = elem["predicted"]
+                    if predicted and isinstance(predicted[0], list): # documents indexed before the explicit mapping
+                        predicted = predicted[0]
+                    elem["predicted"] = list(zip(model.classes_, predicted))
                 result = [str(elem) for elem in result]
                 print("\n".join(result))
             else:
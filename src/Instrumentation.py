@@ -0,0 +1,205 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter, time
+import json
+import logging
+import os
+import threading
+import urllib.parse as urlParse
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class MetricsRegistry:
+    """Class used to record the counters and latency histograms of the project's stages (feed fetch, page download, shelve write, ES calls, ...)
+    Every metric is tagged with a set of labels (stage, feed, host, ...), the registry is shared by all threads
+    Attributes
+    ----------
+    enabled : bool
+        If False, nothing is recorded
+    counters : dict
+        The counters, by name then by sorted label tuple
+    histograms : dict
+        The latency histograms, by stage then by sorted label tuple, each one is [bucketCounts, count, sum]
+    """
+
+    def __init__(self, buckets_ = BUCKETS):
+        self.enabled = True
+        self.buckets = buckets_
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def increment(self, name_, value_ = 1, **labels_):
+        """
+        Adds the given value to a counter
+        """
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels_.items()))
+        with self.lock:
+            series = self.counters.setdefault(name_, {})
+            series[key] = series.get(key, 0) + value_
+
+    def observe(self, stage_, seconds_, **labels_):
+        """
+        Records the duration of one run of the given stage
+        """
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels_.items()))
+        with self.lock:
+            series = self.histograms.setdefault(stage_, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = [[0] * len(self.buckets), 0, 0.0]
+            index = bisect_left(self.buckets, seconds_)
+            if index < len(self.buckets):
+                histogram[0][index] += 1
+            histogram[1] += 1
+            histogram[2] += seconds_
+
+    @contextmanager
+    def timed(self, stage_, **labels_):
+        """
+        Records the duration of the enclosed block under the given stage, whether it raises or not
+        """
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage_, perf_counter() - start, **labels_)
+
+    def snapshot(self):
+        """
+        Returns
+        -------
+        dict
+            A JSON serialisable copy of every metric
+        """
+        with self.lock:
+            return {
+                "timestamp": time(),
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self.counters.items()
+                },
+                "histograms": {
+                    stage: [
+                        {"labels": dict(key), "buckets": dict(zip(map(str, self.buckets), counts)), "count": count, "sum": total}
+                        for key, (counts, count, total) in series.items()
+                    ]
+                    for stage, series in self.histograms.items()
+                }
+            }
+
+    def toPrometheus(self):
+        """
+        Returns
+        -------
+        str
+            Every metric in the Prometheus text exposition format
+        """
+        def formatLabels(labels_):
+            if not labels_:
+                return ""
+            return "{" + ",".join(k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in labels_) + "}"
+
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append("# TYPE fouine_" + name + "_total counter")
+                for key, value in series.items():
+                    lines.append("fouine_" + name + "_total" + formatLabels(key) + " " + str(value))
+            lines.append("# TYPE fouine_stage_seconds histogram")
+            for stage, series in sorted(self.histograms.items()):
+                for key, (counts, count, total) in series.items():
+                    labels = (("stage", stage),) + key
+                    cumulated = 0
+                    for bound, bucketCount in zip(self.buckets, counts):
+                        cumulated += bucketCount
+                        lines.append("fouine_stage_seconds_bucket" + formatLabels(labels + (("le", str(bound)),)) + " " + str(cumulated))
+                    lines.append("fouine_stage_seconds_bucket" + formatLabels(labels + (("le", "+Inf"),)) + " " + str(count))
+                    lines.append("fouine_stage_seconds_count" + formatLabels(labels) + " " + str(count))
+                    lines.append("fouine_stage_seconds_sum" + formatLabels(labels) + " " + repr(total))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path_):
+        """
+        Writes every metric to the given file, in the Prometheus text format if its extension is .prom, as a JSON snapshot otherwise
+        """
+        with open(path_, "w") as fHandle:
+            if path_.endswith(".prom"):
+                fHandle.write(self.toPrometheus())
+            else:
+                json.dump(self.snapshot(), fHandle, indent=2)
+
+# the registry shared by Fetcher, FetcherPool, Indexer and Vectoriser
+metrics = MetricsRegistry()
+
+def hostOf(url_):
+    """
+    Returns the host of the given URL, used to tag the metrics
+    """
+    try:
+        return urlParse.urlsplit(str(url_)).netloc or None
+    except ValueError:
+        return None
+
+class StructuredFormatter(logging.Formatter):
+    """Class used to format log records as a line of key=value pairs, or as a JSON object
+    The structured fields are given through the "fields" entry of the extra argument of the logging calls
+    """
+
+    def __init__(self, json_ = False):
+        super().__init__()
+        self.json = json_
+
+    def format(self, record_):
+        fields = {
+            "time": self.formatTime(record_, "%Y-%m-%dT%H:%M:%S"),
+            "level": record_.levelname,
+            "logger": record_.name,
+            "thread": record_.threadName,
+            "msg": record_.getMessage()
+        }
+        fields.update(getattr(record_, "fields", {}))
+        if record_.exc_info:
+            fields["exc"] = self.formatException(record_.exc_info)
+        if self.json:
+            return json.dumps(fields, default=str)
+        return " ".join(k + "=" + (json.dumps(v, default=str) if isinstance(v, str) and (" " in v or not v) else str(v)) for k, v in fields.items())
+
+def configureLogging(level_ = None, json_ = None):
+    """
+    Sets up the project's loggers, called by the scripts
+    Parameters
+    ----------
+    level_ : str, optional
+        The minimum level of the logged records, default is the FOUINE_LOG_LEVEL environment variable or "INFO"
+    json_ : bool, optional
+        If True, records are written as JSON objects, default is True if the FOUINE_LOG_FORMAT environment variable is "json"
+    """
+    if level_ is None:
+        level_ = os.environ.get("FOUINE_LOG_LEVEL", "INFO")
+    if json_ is None:
+        json_ = os.environ.get("FOUINE_LOG_FORMAT", "text") == "json"
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(json_))
+    logger = logging.getLogger("fouine")
+    logger.handlers = [handler]
+    logger.setLevel(level_.upper())
+    logger.propagate = False
+
+def getLogger(name_):
+    """
+    Returns the logger of the given module, child of the "fouine" logger
+    """
+    return logging.getLogger("fouine." + name_)
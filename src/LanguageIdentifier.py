@@ -0,0 +1,155 @@
+from collections import Counter, OrderedDict
+from hashlib import md5
+import threading
+from langdetect import DetectorFactory, detect
+from langdetect.lang_detect_exception import LangDetectException
+
+# langdetect is randomised unless seeded, which makes the same text flip between languages from one run to another
+DetectorFactory.seed = 0
+
+def normaliseLanguage(lang_):
+    """
+    Reduces a language tag (such as "fr-FR", "en_US" or "EN") to its lowercase primary subtag
+    Returns
+    -------
+    str
+        the primary subtag, None if the given tag is empty or None
+    """
+    if not lang_:
+        return None
+    primary = str(lang_).strip().replace('_', '-').split('-')[0].lower()
+    if not primary.isalpha():
+        return None
+    return primary
+
+class LanguageIdentifier:
+    """Class used to identify the language of the items of a single RSS feed, the statistical detector is only called when the cheap signals are missing or disagree
+    The signals are used in the following order: the language declared by the RSS feed, the <html lang> attribute of the page, the running prior of the feed and finally langdetect
+    Attributes
+    ----------
+    feedLanguage : str
+        The language declared by the RSS feed (its language element), None if it did not declare any
+    prior : Counter
+        The number of items identified in each language so far for this feed
+    minPriorCount : int
+        The minimum number of identified items before the prior can be trusted
+    minPriorShare : float
+        The minimum share of the most common language in the prior before it can be trusted
+    minTextLength : int
+        Texts shorter than this are resolved with the prior (if it can be trusted) rather than langdetect, which is unreliable on short strings
+    detectorCalls : int
+        The number of times langdetect was actually called by this instance (cache hits excluded)
+    cacheHits : int
+        The number of times this instance found a langdetect result in the cache
+    decisions : Counter
+        The number of items of this instance decided by each signal: "hint" (a declared language), "prior" or "detector" (langdetect, cached or not)
+    """
+
+    cacheSize = 100000
+    _cache = OrderedDict()
+    _cacheLock = threading.Lock()
+
+    def __init__(self, feedLanguage_ = None, minPriorCount_ = 5, minPriorShare_ = 0.9, minTextLength_ = 40):
+        """
+        Parameters
+        ----------
+        feedLanguage_ : str, optional
+            The language declared by the RSS feed
+        minPriorCount_ : int, optional
+            The minimum number of identified items before the prior can be trusted
+        minPriorShare_ : float, optional
+            The minimum share of the most common language before the prior can be trusted
+        minTextLength_ : int, optional
+            The length under which a text is considered too short for langdetect
+        """
+        self.feedLanguage = normaliseLanguage(feedLanguage_)
+        self.prior = Counter()
+        self.minPriorCount = minPriorCount_
+        self.minPriorShare = minPriorShare_
+        self.minTextLength = minTextLength_
+        self.detectorCalls = 0
+        self.cacheHits = 0
+        self.decisions = Counter()
+
+    def setFeedLanguage(self, feedLanguage_):
+        """
+        Sets the language declared by the RSS feed, typically once the feed has been parsed
+        """
+        self.feedLanguage = normaliseLanguage(feedLanguage_)
+
+    def priorLanguage(self):
+        """
+        Returns the most common language of the feed if the prior can be trusted
+        Returns
+        -------
+        str
+            the language, None if not enough items were identified or if the feed is not consistent enough
+        """
+        total = sum(self.prior.values())
+        if total < self.minPriorCount:
+            return None
+        lang, count = self.prior.most_common(1)[0]
+        if count / total < self.minPriorShare:
+            return None
+        return lang
+
+    def detect(self, text_):
+        """
+        Calls langdetect on the given text, results are cached by text hash and shared between all instances
+        Returns
+        -------
+        str
+            the detected language, None if langdetect could not tell
+        """
+        if not text_:
+            return None
+        key = md5(text_.encode()).hexdigest()
+        with LanguageIdentifier._cacheLock:
+            if key in LanguageIdentifier._cache:
+                LanguageIdentifier._cache.move_to_end(key)
+                self.cacheHits += 1
+                return LanguageIdentifier._cache[key]
+        try:
+            lang = detect(text_)
+        except LangDetectException:
+            lang = None
+        self.detectorCalls += 1
+        with LanguageIdentifier._cacheLock:
+            LanguageIdentifier._cache[key] = lang
+            if len(LanguageIdentifier._cache) > LanguageIdentifier.cacheSize:
+                LanguageIdentifier._cache.popitem(last=False)
+        return lang
+
+    def identify(self, text_, pageLanguage_ = None):
+        """
+        Returns the language of an item of the feed, and updates the feed's prior with it
+        Parameters
+        ----------
+        text_ : str
+            The text of the item (its description or its title), only used if the cheap signals are not enough
+        pageLanguage_ : str, optional
+            The lang attribute of the <html> element of the item's page
+        Returns
+        -------
+        str
+            the identified language, None if it could not be identified
+        """
+        hints = set(lang for lang in (self.feedLanguage, normaliseLanguage(pageLanguage_)) if lang is not None)
+        prior = self.priorLanguage()
+
+        if len(hints) == 1 and not (self.feedLanguage is None and prior is not None and prior != next(iter(hints))):
+            # a single declared language is trusted, unless it is the only signal and contradicts a trusted prior
+            lang, decision = next(iter(hints)), "hint"
+        elif prior is not None and not hints and len(text_ or "") < self.minTextLength:
+            # there is no declared language and the text is too short for langdetect
+            lang, decision = prior, "prior"
+        else:
+            # the declared languages disagree, contradict the prior, or there is none
+            lang, decision = self.detect(text_), "detector"
+            if lang is None:
+                lang, decision = prior, "prior"
+
+        if lang is not None:
+            self.prior[lang] += 1
+            self.decisions[decision] += 1
+        return lang
@@ -1,12 +1,12 @@
 from collections import Counter
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 from stop_words import get_stop_words
 from snowballstemmer import EnglishStemmer, FrenchStemmer
 from more_itertools import split_at
 import numpy as np
 
 
-from sklearn.feature_extraction import DictVectorizer, text as skTxt
+from sklearn.feature_extraction import DictVectorizer
 from sklearn.model_selection import train_test_split
 from sklearn.svm import SVC
 from sklearn.linear_model import LogisticRegression
@@ -19,6 +19,8 @@ from sklearn.metrics import recall_score, f1_score
 
 from scipy.sparse import csr_matrix
 
+from Instrumentation import metrics
+
 def simplify(str_: str, lang_: str) -> str:
     """
     Stemmifies and removes stop words from the given string
@@ -55,39 +57,167 @@ def simplify(str_: str, lang_: str) -> str:
         )
     return u' '.join(stemmify(word) for word in removeStopWords(str_.lower()))
 
-def getTfidf(str_: List[str]) -> Tuple[Dict[str, float], DictVectorizer]:
+class IncrementalTfidf:
+    """Class used to compute sparse tfIdf vectors, the document frequencies are kept up to date as documents arrive so that it can be fitted on a stream
+    Vectorising a document only costs time proportional to its own number of words, not to the size of the vocabulary
+    Columns are never reordered: a new term gets the next free column, so vectors produced before and after a partialFit stay compatible
+    Attributes
+    ----------
+    vocabulary : dict
+        The column of each known term
+    documentFrequency : list
+        The number of documents containing each term, by column
+    documentCount : int
+        The number of documents seen so far
+    sublinearTf : bool
+        If True, the term frequency is replaced by 1 + log(tf)
+    normalise : bool
+        If True, each vector is scaled to a unit euclidean norm
+    """
+
+    def __init__(self, sublinearTf_: bool = False, normalise_: bool = True):
+        self.vocabulary: Dict[str, int] = {}
+        self.documentFrequency: List[int] = []
+        self.documentCount = 0
+        self.sublinearTf = sublinearTf_
+        self.normalise = normalise_
+        self._idf = None
+
+    @staticmethod
+    def _termCounts(doc_) -> Dict[str, int]:
+        if isinstance(doc_, str):
+            return Counter(word for word in doc_.split(' ') if word)
+        return doc_
+
+    @property
+    def nFeatures(self) -> int:
+        return len(self.vocabulary)
+
+    def partialFit(self, docs_: Iterable) -> "IncrementalTfidf":
+        """
+        Updates the document frequencies with the given documents
+        Parameters
+        ----------
+        docs_ : iterable
+            The documents, either as simplified strings or as term count mappings
+        """
+        for doc in docs_:
+            for term in self._termCounts(doc):
+                column = self.vocabulary.get(term)
+                if column is None:
+                    self.vocabulary[term] = len(self.documentFrequency)
+                    self.documentFrequency.append(1)
+                else:
+                    self.documentFrequency[column] += 1
+            self.documentCount += 1
+        self._idf = None
+        return self
+
+    def fit(self, docs_: Iterable) -> "IncrementalTfidf":
+        """
+        Resets the document frequencies and computes them from the given documents, which may be a generator
+        """
+        self.vocabulary = {}
+        self.documentFrequency = []
+        self.documentCount = 0
+        return self.partialFit(docs_)
+
+    def idf(self) -> np.ndarray:
+        """
+        Returns the smoothed inverse document frequency of each column, ln((1 + n) / (1 + df)) + 1
+        """
+        if self._idf is None or len(self._idf) != len(self.documentFrequency):
+            self._idf = np.log((1 + self.documentCount) / (1 + np.asarray(self.documentFrequency, dtype=float))) + 1
+        return self._idf
+
+    def vectorise(self, doc_, nFeatures_: int = None) -> Tuple[List[int], List[float]]:
+        """
+        Returns the non zero columns of the tfIdf vector of a single document, terms that were never fitted are ignored
+        Parameters
+        ----------
+        doc_ : str or dict
+            The document, either as a simplified string or as a term count mapping
+        nFeatures_ : int, optional
+            Only the columns lower than this are kept, used to match the width a model was trained with
+        Returns
+        -------
+        Tuple
+            The column indices and their weights
+        """
+        idf = self.idf()
+        if nFeatures_ is None:
+            nFeatures_ = len(idf)
+        indices = []
+        data = []
+        for term, count in self._termCounts(doc_).items():
+            column = self.vocabulary.get(term)
+            if column is not None and column < nFeatures_ and count > 0:
+                indices.append(column)
+                data.append(((1 + np.log(count)) if self.sublinearTf else count) * idf[column])
+        if self.normalise and data:
+            norm = np.sqrt(np.dot(data, data))
+            data = [value / norm for value in data]
+        return indices, data
+
+    def transform(self, docs_: Iterable, nFeatures_: int = None) -> csr_matrix:
+        """
+        Returns the sparse tfIdf matrix of the given documents, built row by row without any dense intermediate
+        Parameters
+        ----------
+        docs_ : iterable
+            The documents, either as simplified strings or as term count mappings (same input as DictVectorizer)
+        nFeatures_ : int, optional
+            The width of the matrix, default is the current size of the vocabulary
+        """
+        if nFeatures_ is None:
+            nFeatures_ = self.nFeatures
+        indptr = [0]
+        indices = []
+        data = []
+        for doc in docs_:
+            rowIndices, rowData = self.vectorise(doc, nFeatures_)
+            indices += rowIndices
+            data += rowData
+            indptr.append(len(indices))
+        return csr_matrix((np.asarray(data, dtype=float), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)), shape=(len(indptr) - 1, nFeatures_))
+
+    def fitTransform(self, docs_: List) -> csr_matrix:
+        """
+        Fits the document frequencies on the given documents and returns their sparse tfIdf matrix
+        """
+        docs = list(docs_)
+        return self.fit(docs).transform(docs)
+
+def getTfidf(str_: Iterable[str]) -> IncrementalTfidf:
     """
-    Processes the tfIdf of the given corpus of strings and returns the relevent objects
+    Processes the tfIdf of the given corpus of strings, which may be a generator
     Returns
     -------
-    Tuple
-        The TfIdf Dictionnary and the corresponding vectoriser
+    IncrementalTfidf
+        The fitted tfIdf engine
     """
-    tfIdfVecto = skTxt.TfidfVectorizer(use_idf=True)
-    tfIdfMat = tfIdfVecto.fit_transform(str_)
-
-    tfIdfDict = {k: v.item((0,0)) for (k,v) in zip(tfIdfVecto.get_feature_names(), tfIdfMat.T.todense())}
-    return (tfIdfDict, DictVectorizer(sparse=False).fit([tfIdfDict]))
+    return IncrementalTfidf().fit(str_)
 
-#en appelant cette fonction il faudra mettre un DictVectoriser sur lequel fit() a été appelé
-def vectoriseStr(str_: str, tfidfWeights_ : Dict[str, float], translator_: DictVectorizer):
+def vectoriseStr(str_: str, tfidf_: IncrementalTfidf) -> csr_matrix:
     """
-    Returns the weight vector for the given string on the basis of the existing global tfIdf weights
+    Returns the sparse weight vector for the given string on the basis of the existing global tfIdf weights
 
     Returns
     -------
-    Array
-        the word vector
+    csr_matrix
+        the word vector, as a single row matrix
     """
-    cnt: dict = Counter(str_.split(' '))
-    weighted = {k: tfidfWeights_[k]*cnt.get(k, 0.0) for k in tfidfWeights_}
-    return translator_.transform(weighted)[0]
+    return tfidf_.transform([str_])
 
-def vectoriseAsSparse(strList_: List[str], tfidfDict_: Dict[str, float], tfidfVec_):
+def vectoriseAsSparse(strList_: Iterable[str], tfidf_: IncrementalTfidf = None):
     """
-    returns a sparse tfIdf matrix, meant to be used for generating training and testing data
+    returns a sparse tfIdf matrix and the associated tfIdf engine, meant to be used for generating training and testing data
+    If no engine is given, a new one is fitted on the given strings
     """
-    return csr_matrix([vectoriseStr(string, tfidfDict_, tfidfVec_) for string in strList_], dtype=np.float)
+    if tfidf_ is None:
+        strList_ = list(strList_)
+        tfidf_ = getTfidf(strList_)
+    return tfidf_.transform(strList_), tfidf_
 
 def vectoriseAsSparse_noTfIdf(strList_: List[str]):
     """
@@ -123,7 +253,8 @@ def train(classifier_: str, xTrain_: List[List[float]], yTrain_: List[str]) -> M
         "ranfor": RandomForestClassifier()
     }
     classifier = classifierOptions.get(classifier_)
-    classifier.fit(xTrain_, yTrain_)
+    with metrics.timed("train", classifier=classifier_):
+        classifier.fit(xTrain_, yTrain_)
     return classifier
 
 def printStats(reference_: List[str], predicted_: List[str]):
@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+"""Benchmark and accuracy comparison between langdetect called on every item (the former behaviour of Fetcher.translateToItemObject) and LanguageIdentifier
+The items are synthetic feeds built from short and long french and english texts, some feeds declare their language, some pages declare theirs (sometimes wrongly)
+Every item text is distinct, as real descriptions are, and the cache of LanguageIdentifier is emptied before it is timed, so cache hits only come from the run itself
+Usage: python3 ./src/benchLanguage.py [numberOfFeeds] [itemsPerFeed]
+"""
+
+import random
+from collections import Counter
+from sys import argv
+from time import perf_counter
+from langdetect import detect
+from langdetect.lang_detect_exception import LangDetectException
+from LanguageIdentifier import LanguageIdentifier
+
+SAMPLES = {
+    "fr": [
+        "Le gouvernement présente son budget",
+        "Grève à la SNCF ce jeudi",
+        "Les marchés européens reculent après l'annonce de la banque centrale",
+        "Le Sénat adopte le projet de loi sur la réforme des retraites en première lecture",
+        "La croissance française devrait ralentir au prochain trimestre selon l'Insee, qui revoit ses prévisions à la baisse",
+        "Les députés ont voté dans la nuit un amendement qui modifie profondément le financement des collectivités locales",
+        "Météo : orages attendus",
+        "Le président de la République s'exprimera ce soir à la télévision pour annoncer de nouvelles mesures",
+    ],
+    "en": [
+        "Government unveils new budget",
+        "Rail strike on Thursday",
+        "European markets fall after the central bank announcement",
+        "The Senate passed the pension reform bill in its first reading late on Tuesday",
+        "French growth is expected to slow down next quarter according to the national statistics office",
+        "Lawmakers voted overnight on an amendment that deeply changes how local authorities are funded",
+        "Weather: storms ahead",
+        "The president will address the nation tonight to announce a new set of measures",
+    ]
+}
+
+PLACES = ["Paris", "Lyon", "Marseille", "Lille", "Nantes", "Bordeaux", "London", "Leeds", "Dublin", "Brussels", "Geneva", "Montreal"]
+
+MONTHS = {
+    "fr": "janvier février mars avril mai juin juillet août septembre octobre novembre décembre".split(),
+    "en": "January February March April May June July August September October November December".split()
+}
+
+def itemText(rnd_, lang_, number_):
+    """
+    Returns a distinct item text, made of one or two sample sentences, sometimes followed by a place and a date, and of the item number
+    """
+    sentences = " ".join(rnd_.sample(SAMPLES[lang_], rnd_.choice((1, 1, 2))))
+    place, day, month = rnd_.choice(PLACES), rnd_.randint(1, 28), rnd_.choice(MONTHS[lang_])
+    if rnd_.random() < 0.3:
+        # short headlines stay short
+        return sentences + " (" + str(number_) + ")"
+    if lang_ == "fr":
+        return sentences + ", à " + place + " le " + str(day) + " " + month + " (dépêche " + str(number_) + ")"
+    return sentences + ", in " + place + " on " + month + " " + str(day) + " (story " + str(number_) + ")"
+
+def makeFeeds(feedCount_, itemsPerFeed_, seed_ = 0):
+    """
+    Builds synthetic feeds, each one is (declaredLanguage, [(text, pageLanguage, trueLanguage), ...])
+    """
+    rnd = random.Random(seed_)
+    feeds = []
+    number = 0
+    for _ in range(feedCount_):
+        lang = rnd.choice(list(SAMPLES))
+        declared = rnd.choice((lang, lang + "-" + lang.upper(), None))
+        items = []
+        for _ in range(itemsPerFeed_):
+            # a few foreign items slip into otherwise monolingual feeds
+            itemLang = lang if rnd.random() < 0.95 else rnd.choice(list(SAMPLES))
+            pageLang = rnd.choice((itemLang, itemLang, None, lang))
+            number += 1
+            items.append((itemText(rnd, itemLang, number), pageLang, itemLang))
+        feeds.append((declared, items))
+    return feeds
+
+def runBaseline(feeds_):
+    predicted = []
+    for _, items in feeds_:
+        for text, _, _ in items:
+            try:
+                predicted.append(detect(text))
+            except LangDetectException:
+                predicted.append(None)
+    return predicted, {"langdetect calls": sum(len(items) for _, items in feeds_)}
+
+def runIdentifier(feeds_):
+    predicted = []
+    stats = Counter()
+    for declared, items in feeds_:
+        identifier = LanguageIdentifier(declared)
+        predicted += [identifier.identify(text, pageLang) for text, pageLang, _ in items]
+        stats["langdetect calls"] += identifier.detectorCalls
+        stats["cache hits"] += identifier.cacheHits
+        for decision, count in identifier.decisions.items():
+            stats["decided by " + decision] += count
+    return predicted, stats
+
+def report(name_, feeds_, run_):
+    expected = [lang for _, items in feeds_ for _, _, lang in items]
+    start = perf_counter()
+    predicted, stats = run_(feeds_)
+    elapsed = perf_counter() - start
+    accuracy = sum(1 for (a, b) in zip(expected, predicted) if a == b) / len(expected)
+    print(name_ + ":")
+    print("\ttime: " + "{:.3f}".format(elapsed) + "s (" + "{:.1f}".format(1e6 * elapsed / len(expected)) + "µs per item)")
+    for name in sorted(stats):
+        print("\t" + name + ": " + str(stats[name]))
+    print("\taccuracy: " + str(accuracy))
+
+if __name__ == "__main__":
+    feedCount = int(argv[1]) if len(argv) > 1 else 50
+    itemsPerFeed = int(argv[2]) if len(argv) > 2 else 40
+    feeds = makeFeeds(feedCount, itemsPerFeed)
+    print(str(feedCount) + " feeds, " + str(feedCount * itemsPerFeed) + " items\n")
+    print(str(len(set(text for _, items in feeds for text, _, _ in items))) + " distinct texts\n")
+    report("langdetect on every item", feeds, runBaseline)
+    LanguageIdentifier._cache.clear()
+    report("LanguageIdentifier", feeds, runIdentifier)
@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+"""Offline end-to-end benchmark of the fill, merge, simplify, train, tfidf, index, reindex and export steps
+A local FixtureServer serves synthetic RSS feeds and pages, and an ElasticSearchStandIn receives the indexed documents, so nothing leaves the machine
+The results are written as JSON and compared to a stored baseline, the script exits with code 1 if a step got slower than the allowed tolerance
+Usage: python3 ./src/benchmark.py --help
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shelve
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+from joblib import dump
+
+from FixtureServer import FixtureServer
+from ElasticSearchStandIn import ElasticSearchStandIn
+from FetcherPool import FetcherPool
+from Indexer import Indexer
+from Exporter import Exporter
+import Vectoriser
+
+class Stopwatch:
+    """Class used to time the steps of the benchmark
+    Attributes
+    ----------
+    stages : dict
+        The measured steps, by name, each one is a dictionnary holding the elapsed seconds, the number of processed items and the throughput
+    """
+
+    def __init__(self, quiet_ = True):
+        self.stages = {}
+        self.quiet = quiet_
+
+    @contextlib.contextmanager
+    def measure(self, name_, items_ = None):
+        """
+        Times the enclosed block, the console output of the block is discarded if quiet
+        Parameters
+        ----------
+        name_ : str
+            The name of the step
+        items_ : int or callable, optional
+            The number of processed items, or a function returning it once the block is done
+        """
+        output = io.StringIO() if self.quiet else sys.stdout
+        start = perf_counter()
+        with contextlib.redirect_stdout(output):
+            yield
+        elapsed = perf_counter() - start
+        items = items_() if callable(items_) else items_
+        self.stages[name_] = {
+            "seconds": elapsed,
+            "items": items,
+            "itemsPerSecond": items / elapsed if items and elapsed > 0 else None
+        }
+        print("{:<10} {:>9.3f}s".format(name_, elapsed) + ("" if items is None else "  {:>7} items  {:>10.1f} items/s".format(items, items / elapsed if elapsed > 0 else 0)))
+
+def run(args_):
+    """
+    Runs every step of the benchmark in a temporary folder and returns the results
+    """
+    watch = Stopwatch(not args_.verbose)
+    workFolder = tempfile.mkdtemp(prefix="fouineBench")
+    persistentFolder = workFolder + "/content"
+    memoryFolder = workFolder + "/memory"
+    os.mkdir(persistentFolder)
+    os.mkdir(memoryFolder)
+    mergedShelve = memoryFolder + "/FetcherDataPool/data.shelve"
+    previousFolder = os.getcwd()
+    os.chdir(workFolder)
+
+    try:
+        with FixtureServer(args_.feeds, args_.items, args_.words, args_.latency, not args_.no_304, args_.redirects, args_.french) as server, ElasticSearchStandIn() as elasticSearch:
+            feedList = server.feedList()
+
+            fPool = FetcherPool(feedList, persistentFolder, memoryFolder)
+            with watch.measure("fill", args_.feeds * args_.items):
+                fPool.launchAll(args_.multithreaded)
+
+            with watch.measure("merge", lambda: len(fPool.shelveHandler)):
+                fPool.joinAllData()
+            fPool.save()
+
+            requestsBefore = server.requestCount
+            fPool = FetcherPool(feedList, persistentFolder, memoryFolder)
+            with watch.measure("refetch", lambda: server.requestCount - requestsBefore):
+                fPool.launchAll(args_.multithreaded)
+            fPool.save()
+
+            with watch.measure("simplify", args_.feeds * args_.items):
+                for n, (lang, _, _) in enumerate(server.feeds):
+                    for i in range(args_.items):
+                        Vectoriser.simplify(u" ".join(server.pageParagraphs(n, i)), lang)
+
+            sourceDataTable = shelve.open(mergedShelve, flag='r')
+            contents = [(v[6], v[8]) for (_, v) in sourceDataTable.items() if v[5] in ("fr", "en")]
+            sourceDataTable.close()
+            with watch.measure("train", len(contents)):
+                x, vectorizer = Vectoriser.vectoriseAsSparse_noTfIdf(con[0] for con in contents)
+                trainedModel = Vectoriser.train("ranfor", x, [con[1][0] for con in contents])
+            with watch.measure("tfidf", len(contents)):
+                Vectoriser.vectoriseAsSparse(con[0] for con in contents)
+            dump(trainedModel, "./content/trainedModel.joblib")
+            dump(vectorizer, "./content/vectorizer.joblib")
+
+            with watch.measure("index", lambda: len(elasticSearch.documents(Indexer.indexName))):
+                Indexer.fill(mergedShelve, elasticSearch.host, elasticSearch.port)
+
+            with watch.measure("reindex", lambda: len(elasticSearch.documents(Indexer.indexName))):
+                Indexer.rebuild(mergedShelve, elasticSearch.host, elasticSearch.port)
+
+            exporter = Exporter(batchSize_=100)
+            with watch.measure("export", lambda: exported):
+                exported = exporter.write(exporter.scanIndex(elasticSearch.host, elasticSearch.port, 2), workFolder + "/export.jsonl")
+    finally:
+        os.chdir(previousFolder)
+        shutil.rmtree(workFolder, ignore_errors=True)
+
+    return {
+        "config": {k: v for k, v in vars(args_).items() if k not in ("output", "baseline", "save_baseline", "tolerance", "verbose")},
+        "stages": watch.stages
+    }
+
+def compare(results_, baseline_, tolerance_):
+    """
+    Prints the ratio between each step and its baseline
+    Returns
+    -------
+    list
+        the names of the steps that got slower than the allowed tolerance
+    """
+    regressions = []
+    if baseline_.get("config") != results_["config"]:
+        print("warning: the baseline was measured with a different configuration")
+    print("\ncomparison with baseline (tolerance " + str(int(tolerance_ * 100)) + "%):")
+    for name, stage in results_["stages"].items():
+        reference = baseline_.get("stages", {}).get(name)
+        if reference is None or not reference.get("seconds"):
+            print("{:<10} no baseline".format(name))
+            continue
+        ratio = stage["seconds"] / reference["seconds"]
+        regressed = ratio > 1 + tolerance_
+        if regressed:
+            regressions.append(name)
+        print("{:<10} x{:.2f}".format(name, ratio) + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of Fetcher, FetcherPool, Vectoriser and Indexer")
+    parser.add_argument("--feeds", type=int, default=20, help="number of served RSS feeds")
+    parser.add_argument("--items", type=int, default=20, help="number of items per feed")
+    parser.add_argument("--words", type=int, default=400, help="number of words per article page")
+    parser.add_argument("--latency", type=float, default=0.0, help="delay in seconds added to every HTTP answer")
+    parser.add_argument("--no-304", action="store_true", help="never answer 304 Not Modified to the feed requests")
+    parser.add_argument("--redirects", type=float, default=0.1, help="share of feeds behind a 301 redirection")
+    parser.add_argument("--french", type=float, default=0.5, help="share of feeds written in french")
+    parser.add_argument("--multithreaded", action="store_true", help="launch the fetchers in parallel")
+    parser.add_argument("--output", default="./content/benchmark.json", help="where the results are written")
+    parser.add_argument("--baseline", default="./content/benchmarkBaseline.json", help="the results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a step is reported as a regression")
+    parser.add_argument("--verbose", action="store_true", help="keep the console output of the benchmarked code")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    with open(args.output, "w") as fHandle:
+        json.dump(results, fHandle, indent=2)
+    print("\nresults written to " + args.output)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as fHandle:
+            json.dump(results, fHandle, indent=2)
+        print("baseline written to " + args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as fHandle:
+            if compare(results, json.load(fHandle), args.tolerance):
+                exit(1)
+    else:
+        print("no baseline found at " + args.baseline + ", run with --save-baseline to create one")
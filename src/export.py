@@ -0,0 +1,35 @@
+#!/usr/bin/python3
+"""Streams the indexed corpus, or a filtered slice of it, out of ElasticSearch or out of the pooled shelve
+Example: python3 ./src/export.py --language fr --label ECO --date-from 2020-10-01 --date-to 2020-11-01 --output ./content/export.jsonl
+"""
+
+import argparse
+from memory_tempfile import MemoryTempfile
+from Exporter import Exporter, FIELDS
+from Instrumentation import configureLogging
+
+configureLogging()
+
+parser = argparse.ArgumentParser(description="Streaming export of the indexed corpus")
+parser.add_argument("--source", choices=("index", "shelve"), default="index", help="read the ElasticSearch index or the pooled shelve")
+parser.add_argument("--shelve", default=MemoryTempfile().gettempdir() + '/FetcherDataPool/data.shelve', help="location of the pooled shelve")
+parser.add_argument("--host", default="localhost", help="url of the ElasticSearch instance")
+parser.add_argument("--port", type=int, default=9200, help="TCP port of the ElasticSearch instance")
+parser.add_argument("--slices", type=int, default=1, help="number of parallel workers reading the index")
+parser.add_argument("--language", help="only export the records in this language")
+parser.add_argument("--label", help="only export the records carrying this label")
+parser.add_argument("--origin", help="only export the records fetched from this RSS feed")
+parser.add_argument("--date-from", help="only export the records published at or after this date (ISO 8601)")
+parser.add_argument("--date-to", help="only export the records published before this date (ISO 8601)")
+parser.add_argument("--fields", help="comma separated list of exported fields, among " + ",".join(FIELDS))
+parser.add_argument("--format", choices=("jsonl", "columns", "parquet"), default="jsonl", help="one JSON object per record, one JSON object of columns per batch, or Parquet")
+parser.add_argument("--batch-size", type=int, default=1000, help="number of records of each batch")
+parser.add_argument("--output", default="-", help="destination file, - for the standard output")
+args = parser.parse_args()
+
+exporter = Exporter(args.language, args.label, args.origin, args.date_from, args.date_to, args.fields.split(",") if args.fields else None, args.batch_size)
+if args.source == "shelve":
+    batches = exporter.scanShelve(args.shelve)
+else:
+    batches = exporter.scanIndex(args.host, args.port, args.slices)
+exporter.write(batches, args.output, args.format)
@@ -1,4 +1,9 @@
 from memory_tempfile import MemoryTempfile
 from Indexer import Indexer
+from Instrumentation import metrics, configureLogging
+
+configureLogging()
 
 Indexer.fill(MemoryTempfile().gettempdir() + '/FetcherDataPool/data.shelve')
+metrics.dump("./content/metrics-fillIndexer.json")
+metrics.dump("./content/metrics-fillIndexer.prom")
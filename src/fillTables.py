@@ -1,5 +1,8 @@
 from FetcherPool import FetcherPool
 from sys import argv
+from Instrumentation import metrics, configureLogging
+
+configureLogging()
 
 rssFeedList = [line.rstrip("\n").split(" ") for line in open("./src/feedList.txt").readlines() ]
 
@@ -11,4 +14,6 @@ else:
     fPool.launchAll(False)
 fPool.joinAllData()
 #fPool.purgeFetcherData()
-fPool.save()
\ No newline at end of file
+fPool.save()
+metrics.dump("./content/metrics-fillTables.json")
+metrics.dump("./content/metrics-fillTables.prom")
@@ -0,0 +1,9 @@
+from memory_tempfile import MemoryTempfile
+from Indexer import Indexer
+from Instrumentation import metrics, configureLogging
+
+configureLogging()
+
+Indexer.rebuild(MemoryTempfile().gettempdir() + '/FetcherDataPool/data.shelve')
+metrics.dump("./content/metrics-rebuildIndexer.json")
+metrics.dump("./content/metrics-rebuildIndexer.prom")
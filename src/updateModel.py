@@ -3,6 +3,7 @@ import Indexer
 import shelve
 from memory_tempfile import MemoryTempfile
 from joblib import dump
+from sys import argv
 
 sourceDataTable = shelve.open(MemoryTempfile().gettempdir() + '/FetcherDataPool/data.shelve', flag='r')
 
@@ -15,7 +16,10 @@ contents = [
 print("Done.")
 
 print("Classifying data ...")
-x, vectorizer = Vectoriser.vectoriseAsSparse_noTfIdf(con[0] for con in contents)
+if argv[-1] == "tfidf":
+    x, vectorizer = Vectoriser.vectoriseAsSparse(con[0] for con in contents)
+else:
+    x, vectorizer = Vectoriser.vectoriseAsSparse_noTfIdf(con[0] for con in contents)
 y = [con[1][0] for con in contents]
 
 xTr, xTe, yTr, yTe = Vectoriser.train_test_split(x,y, test_size=0.15)